@@ -2,6 +2,14 @@ import streamlit as st
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
+from sheets_loader import open_worksheet, load_email_frame
+from sheets_cache import SHEET_CACHE
+from email_store import EmailStore
+from email_metrics import body_structure_error, summarize_metrics, word_count
+from exports import build_html_zip, export_artifact
+from library_view import query_library, page_controls, show_search_hits
+from validation import validate_html
+from sheets_writer import CellBatch, sheet_rows, delete_rows_batch, plan_csv_upsert, apply_csv_upsert
 import json
 from datetime import datetime
 import html
@@ -217,6 +225,8 @@ if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'email_store' not in st.session_state:
+    st.session_state.email_store = None
 if 'client' not in st.session_state:
     st.session_state.client = None
 if 'worksheet' not in st.session_state:
@@ -250,80 +260,32 @@ def log_activity(action, details=""):
     # Keep only last 50 activities
     st.session_state.activity_log = st.session_state.activity_log[:50]
 
-def get_email_stats(df):
-    """Calculate comprehensive email statistics"""
-    if df is None or len(df) == 0:
-        return {
-            'total': 0,
-            'completed': 0,
-            'pending': 0,
-            'draft': 0,
-            'progress': 0,
-            'avg_html_length': 0,
-            'completion_rate': 0
-        }
-    
-    completed = len(df[df['Complete_HTML_Code'].astype(str).str.strip() != ''])
-    total = len(df)
-    pending = total - completed
-    
-    # Calculate average HTML length
-    html_lengths = df[df['Complete_HTML_Code'].astype(str).str.strip() != '']['Complete_HTML_Code'].astype(str).str.len()
-    avg_length = html_lengths.mean() if len(html_lengths) > 0 else 0
-    
-    return {
-        'total': total,
-        'completed': completed,
-        'pending': pending,
-        'draft': 0,  # Can be enhanced later
-        'progress': (completed / 52 * 100) if total > 0 else 0,
-        'avg_html_length': int(avg_length),
-        'completion_rate': (completed / total * 100) if total > 0 else 0
-    }
+def invalidate_data():
+    """Drop the cached sheet data so the next load re-pulls it"""
+    SHEET_CACHE.invalidate(SHEET_ID)
+    st.session_state.df = None
 
-def validate_html(html_code):
-    """Basic HTML validation"""
-    issues = []
-    
-    if not html_code or html_code.strip() == "":
-        return ["HTML code is empty"]
-    
-    # Check for basic structure
-    if '<html' not in html_code.lower():
-        issues.append("Missing <html> tag")
-    if '<body' not in html_code.lower():
-        issues.append("Missing <body> tag")
-    if '</html>' not in html_code.lower():
-        issues.append("Missing closing </html> tag")
-    if '</body>' not in html_code.lower():
-        issues.append("Missing closing </body> tag")
-    
-    # Check for balanced tags (basic check)
-    open_tags = len(re.findall(r'<(?!/)(\w+)', html_code))
-    close_tags = len(re.findall(r'</(\w+)>', html_code))
-    
-    if open_tags != close_tags:
-        issues.append(f"Possible unbalanced tags (Open: {open_tags}, Close: {close_tags})")
-    
-    return issues if issues else ["✓ No major issues detected"]
+def bulk_delete(rows_df, description):
+    """Delete newsletter rows in a single request and report the API calls saved"""
+    result = delete_rows_batch(st.session_state.worksheet, sheet_rows(rows_df))
+    st.success(
+        f"✅ Deleted {result['rows']} newsletters in {result['requests']} request "
+        f"({result['calls_saved']} API calls saved)"
+    )
+    log_activity("Bulk Delete", f"Deleted {result['rows']} {description} in {result['ranges']} range(s)")
+    invalidate_data()
 
 def export_email_html(email_data):
     """Export email HTML for download"""
     html_content = str(email_data['Complete_HTML_Code'])
     return html_content.encode('utf-8')
 
-def search_emails(df, search_term):
-    """Advanced search across multiple fields"""
-    if not search_term:
-        return df
-    
-    mask = (
-        df['Email_Number'].astype(str).str.contains(search_term, case=False, na=False) |
-        df['Title'].astype(str).str.contains(search_term, case=False, na=False) |
-        df['Subject_Line'].astype(str).str.contains(search_term, case=False, na=False) |
-        df['Complete_HTML_Code'].astype(str).str.contains(search_term, case=False, na=False)
-    )
-    return df[mask]
+def search_emails(email_store, search_term):
+    """Full-text search over number, title, subject and visible content; returns a row mask"""
+    matches = email_store.search(search_term)
+    if matches is None:
+        return None
+    return email_store.frame.index.isin(list(matches))
 
 # Sidebar
 with st.sidebar:
@@ -385,13 +347,14 @@ with st.sidebar:
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("🔄 Refresh", use_container_width=True):
-                    st.session_state.df = None
+                    invalidate_data()
                     log_activity("Refresh", "Data refreshed from Google Sheets")
                     st.rerun()
             with col2:
                 if st.button("🔌 Disconnect", use_container_width=True):
                     st.session_state.authenticated = False
                     st.session_state.client = None
+                    st.session_state.worksheet = None
                     st.session_state.df = None
                     log_activity("Disconnect", "Disconnected from Google Sheets")
                     st.rerun()
@@ -440,7 +403,7 @@ with st.sidebar:
                 st.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
                 st.markdown("### 📈 Quick Stats")
                 
-                stats = get_email_stats(st.session_state.df)
+                stats = summarize_metrics(st.session_state.email_store.metrics)
                 
                 st.metric("Total Emails", stats['total'], delta=f"{stats['total']}/52")
                 st.metric("Completed", stats['completed'], delta=f"{stats['completion_rate']:.1f}%")
@@ -486,26 +449,16 @@ st.markdown('<div class="sub-header">Comprehensive Email Campaign Management Sys
 # Load data function
 def load_data():
     try:
-        sheet = st.session_state.client.open_by_key(SHEET_ID)
-        worksheet = sheet.get_worksheet(0)
-        st.session_state.worksheet = worksheet
+        if st.session_state.worksheet is None:
+            st.session_state.worksheet = open_worksheet(st.session_state.client, SHEET_ID)
+        worksheet = st.session_state.worksheet
         
-        data = worksheet.get_all_values()
-        
-        if len(data) > 0:
-            df = pd.DataFrame(data[1:], columns=data[0])
-            
-            required_columns = ['Email_Number', 'Title', 'Subject_Line', 'Complete_HTML_Code']
-            for col in required_columns:
-                if col not in df.columns:
-                    df[col] = ''
-            
-            # Convert Email_Number to numeric for proper sorting
-            df['Email_Number'] = pd.to_numeric(df['Email_Number'], errors='coerce')
-            
-            return df[required_columns]
-        else:
-            return pd.DataFrame(columns=['Email_Number', 'Title', 'Subject_Line', 'Complete_HTML_Code'])
+        # Shared across sessions; re-pulled only when the sheet's revision changed.
+        # The week index is built once per load and dropped with the cache on writes.
+        return SHEET_CACHE.get(
+            st.session_state.client, SHEET_ID, None,
+            lambda: EmailStore(load_email_frame(worksheet), source=SHEET_ID)
+        )
     
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -515,14 +468,19 @@ def load_data():
 # Only proceed if authenticated
 if st.session_state.authenticated:
     
-    # Load data if not already loaded
+    # Load data through the shared cache so edits from other sessions show up
     if st.session_state.df is None:
         with st.spinner("🔄 Loading newsletter data from Google Sheets..."):
-            st.session_state.df = load_data()
+            email_store = load_data()
+    else:
+        email_store = load_data()
+    st.session_state.email_store = email_store
+    st.session_state.df = email_store.frame if email_store is not None else None
     
     if st.session_state.df is not None:
         df = st.session_state.df
-        stats = get_email_stats(df)
+        metrics = email_store.metrics
+        stats = summarize_metrics(metrics)
         
         # Enhanced metrics row
         st.markdown('<div class="stats-container">', unsafe_allow_html=True)
@@ -606,7 +564,7 @@ if st.session_state.authenticated:
             with search_col1:
                 search_term = st.text_input(
                     "🔍 Search newsletters",
-                    placeholder="Search by number, title, subject, or content...",
+                    placeholder='Search by number, title, subject, or content ("quotes" for phrases)...',
                     key="search_input"
                 )
             
@@ -628,23 +586,23 @@ if st.session_state.authenticated:
                     ["Ascending", "Descending"]
                 )
             
-            # Apply filters and sorting
-            filtered_df = df.copy()
-            
-            if search_term:
-                filtered_df = search_emails(filtered_df, search_term)
-            
-            if status_filter == "Completed":
-                filtered_df = filtered_df[filtered_df['Complete_HTML_Code'].astype(str).str.strip() != '']
-            elif status_filter == "Pending":
-                filtered_df = filtered_df[filtered_df['Complete_HTML_Code'].astype(str).str.strip() == '']
-            
-            # Sort
-            ascending = sort_order == "Ascending"
-            filtered_df = filtered_df.sort_values(by=sort_by, ascending=ascending)
+            # Apply filters and sorting (index labels only, no frame copy)
+            rows = query_library(
+                df, metrics,
+                search_mask=search_emails(email_store, search_term),
+                has_content={"Completed": True, "Pending": False}.get(status_filter),
+                sort_by=sort_by,
+                ascending=sort_order == "Ascending"
+            )
             
             # Display results count
-            st.markdown(f"**Showing {len(filtered_df)} of {len(df)} newsletters**")
+            st.markdown(f"**Showing {len(rows)} of {len(df)} newsletters**")
+            
+            if search_term:
+                visible = set(rows)
+                hits = [hit for hit in email_store.rank(search_term) if hit['doc_id'] in visible]
+                with st.expander(f"🔎 Best matches for \"{search_term}\"", expanded=True):
+                    show_search_hits(hits[:10])
             
             # Card view or table view toggle
             view_type = st.radio(
@@ -653,20 +611,24 @@ if st.session_state.authenticated:
                 horizontal=True
             )
             
+            # The table is virtualized by st.dataframe; cards and expanders are paged
+            if view_type != "Table View":
+                start, end = page_controls(len(rows), key="library")
+            
             st.markdown("---")
             
             if view_type == "Card View":
-                # Card grid layout
+                # Card grid layout (current page only)
                 cols_per_row = 3
-                rows = (len(filtered_df) + cols_per_row - 1) // cols_per_row
+                grid_rows = (end - start + cols_per_row - 1) // cols_per_row
                 
-                for row_idx in range(rows):
+                for row_idx in range(grid_rows):
                     cols = st.columns(cols_per_row)
                     for col_idx in range(cols_per_row):
-                        idx = row_idx * cols_per_row + col_idx
-                        if idx < len(filtered_df):
-                            email_data = filtered_df.iloc[idx]
-                            has_html = str(email_data['Complete_HTML_Code']).strip() != ''
+                        idx = start + row_idx * cols_per_row + col_idx
+                        if idx < end:
+                            email_data = df.loc[rows[idx]]
+                            has_html = metrics.at[email_data.name, 'Has_Content']
                             status = "Completed" if has_html else "Pending"
                             status_class = "status-completed" if has_html else "status-pending"
                             
@@ -686,11 +648,11 @@ if st.session_state.authenticated:
             
             elif view_type == "Table View":
                 # Enhanced table with status
-                display_df = filtered_df.copy()
-                display_df['Status'] = display_df['Complete_HTML_Code'].apply(
-                    lambda x: '✅ Completed' if str(x).strip() != '' else '⏳ Pending'
+                display_df = df.loc[rows, ['Email_Number', 'Title', 'Subject_Line']]
+                display_df['Status'] = metrics.loc[rows, 'Status'].map(
+                    {'Completed': '✅ Completed', 'Pending': '⏳ Pending'}
                 )
-                display_df['HTML_Length'] = display_df['Complete_HTML_Code'].astype(str).str.len()
+                display_df['HTML_Length'] = metrics.loc[rows, 'Char_Count']
                 
                 st.dataframe(
                     display_df[['Email_Number', 'Title', 'Subject_Line', 'Status', 'HTML_Length']],
@@ -699,8 +661,8 @@ if st.session_state.authenticated:
                 )
             
             else:  # Detailed List
-                for idx, email_data in filtered_df.iterrows():
-                    has_html = str(email_data['Complete_HTML_Code']).strip() != ''
+                for idx, email_data in df.loc[rows[start:end]].iterrows():
+                    has_html = metrics.at[idx, 'Has_Content']
                     status = "Completed" if has_html else "Pending"
                     status_class = "status-completed" if has_html else "status-pending"
                     
@@ -709,7 +671,7 @@ if st.session_state.authenticated:
                         with col1:
                             st.markdown(f"**Subject Line:** {email_data['Subject_Line']}")
                             st.markdown(f"**Status:** <span class='status-badge {status_class}'>{status}</span>", unsafe_allow_html=True)
-                            st.markdown(f"**HTML Length:** {len(str(email_data['Complete_HTML_Code']))} characters")
+                            st.markdown(f"**HTML Length:** {metrics.at[idx, 'Char_Count']} characters")
                         with col2:
                             if st.button("👁️ Preview", key=f"prev_{idx}"):
                                 st.session_state.selected_email = email_data['Email_Number']
@@ -721,7 +683,7 @@ if st.session_state.authenticated:
             st.markdown("---")
             st.markdown("## 👁️ Email Preview")
             
-            email_numbers = filtered_df['Email_Number'].tolist()
+            email_numbers = df.loc[rows, 'Email_Number'].tolist()
             if email_numbers:
                 preview_col1, preview_col2 = st.columns([3, 1])
                 
@@ -729,7 +691,7 @@ if st.session_state.authenticated:
                     selected = st.selectbox(
                         "Select newsletter to preview:",
                         email_numbers,
-                        format_func=lambda x: f"Week {x} - {filtered_df[filtered_df['Email_Number']==x]['Title'].iloc[0]}",
+                        format_func=lambda x: f"Week {x} - {email_store.title(x)}",
                         key="preview_selector"
                     )
                 
@@ -739,7 +701,7 @@ if st.session_state.authenticated:
                     validate_button = st.button("✓ Validate HTML", use_container_width=True)
                 
                 if selected:
-                    email_data = filtered_df[filtered_df['Email_Number'] == selected].iloc[0]
+                    email_data = email_store.get(selected)
                     html_code = str(email_data['Complete_HTML_Code'])
                     
                     # Email metadata
@@ -808,7 +770,7 @@ if st.session_state.authenticated:
                             
                             # Code stats
                             lines = html_code.count('\n') + 1
-                            words = len(html_code.split())
+                            words = word_count(html_code)
                             st.caption(f"📊 Stats: {lines} lines, {words} words, {len(html_code)} characters")
                         
                         elif st.session_state.view_mode == 'split':
@@ -928,7 +890,7 @@ if st.session_state.authenticated:
                 
                 with form_col2:
                     # Check if number already exists
-                    if new_email_number in df['Email_Number'].values:
+                    if email_store.exists(new_email_number):
                         st.warning(f"⚠️ Week {new_email_number} already exists!")
                     else:
                         st.success(f"✅ Week {new_email_number} is available")
@@ -960,6 +922,14 @@ if st.session_state.authenticated:
                     )
                     
                     st.caption(f"📊 {len(new_html)} characters, {new_html.count('<')} HTML tags")
+                    
+                    # Live structure check, cached per body across reruns
+                    if new_html.strip():
+                        mismatch = body_structure_error(new_html)
+                        if mismatch:
+                            st.caption(f"⚠️ {mismatch}")
+                        else:
+                            st.caption("✅ Tags are properly nested")
                 
                 with code_tab2:
                     if new_html.strip():
@@ -989,7 +959,7 @@ if st.session_state.authenticated:
                     else:
                         try:
                             # Check for duplicates
-                            if new_email_number in df['Email_Number'].values:
+                            if email_store.exists(new_email_number):
                                 st.error(f"❌ Week {new_email_number} already exists! Please choose a different number or edit the existing one.")
                             else:
                                 row = [int(new_email_number), new_title, new_subject, new_html]
@@ -998,7 +968,7 @@ if st.session_state.authenticated:
                                 st.success(f"✅ Newsletter Week {new_email_number} created successfully!")
                                 log_activity("Create", f"Created Week {new_email_number}: {new_title}")
                                 st.balloons()
-                                st.session_state.df = None
+                                invalidate_data()
                                 
                                 # Auto-navigate suggestion
                                 st.info("💡 Tip: Switch to the 'Newsletter Library' tab to view your new email!")
@@ -1036,7 +1006,7 @@ if st.session_state.authenticated:
                     edit_selected = st.selectbox(
                         "📧 Select newsletter to edit:",
                         email_numbers,
-                        format_func=lambda x: f"Week {x} - {df[df['Email_Number']==x]['Title'].iloc[0]}"
+                        format_func=lambda x: f"Week {x} - {email_store.title(x)}"
                     )
                 
                 with select_col2:
@@ -1044,8 +1014,8 @@ if st.session_state.authenticated:
                     duplicate_btn = st.button("📋 Duplicate", use_container_width=True)
                 
                 if edit_selected:
-                    email_data = df[df['Email_Number'] == edit_selected].iloc[0]
-                    row_index = df[df['Email_Number'] == edit_selected].index[0] + 2
+                    email_data = email_store.get(edit_selected)
+                    row_index = email_store.sheet_row(edit_selected)
                     
                     # Display current info
                     st.markdown("### 📊 Current Newsletter Info")
@@ -1096,7 +1066,7 @@ if st.session_state.authenticated:
                             
                             # Code statistics
                             lines = edit_html.count('\n') + 1
-                            words = len(edit_html.split())
+                            words = word_count(edit_html)
                             chars = len(edit_html)
                             
                             stat_col1, stat_col2, stat_col3, stat_col4 = st.columns(4)
@@ -1104,6 +1074,13 @@ if st.session_state.authenticated:
                             stat_col2.metric("Words", words)
                             stat_col3.metric("Characters", chars)
                             stat_col4.metric("HTML Tags", edit_html.count('<'))
+                            
+                            # Live structure check, read from the loaded metrics while unedited
+                            mismatch = body_structure_error(edit_html)
+                            if mismatch:
+                                st.caption(f"⚠️ {mismatch}")
+                            else:
+                                st.caption("✅ Tags are properly nested")
                         
                         with edit_tabs[1]:
                             if edit_html.strip():
@@ -1146,7 +1123,7 @@ if st.session_state.authenticated:
                                 
                                 st.success(f"✅ Newsletter Week {edit_selected} updated successfully!")
                                 log_activity("Update", f"Updated Week {edit_selected}: {edit_title}")
-                                st.session_state.df = None
+                                invalidate_data()
                                 st.rerun()
                                 
                             except Exception as e:
@@ -1182,7 +1159,7 @@ if st.session_state.authenticated:
                                         st.session_state.worksheet.delete_rows(row_index)
                                         st.success(f"✅ Week {edit_selected} deleted!")
                                         log_activity("Delete", f"Deleted Week {edit_selected}")
-                                        st.session_state.df = None
+                                        invalidate_data()
                                         st.rerun()
                                     except Exception as e:
                                         st.error(f"❌ Error deleting: {str(e)}")
@@ -1262,10 +1239,10 @@ if st.session_state.authenticated:
                     st.dataframe(progress_df, use_container_width=True, hide_index=True)
                     
                     st.markdown("#### Content Metrics")
-                    st.metric("Total HTML Content", f"{df['Complete_HTML_Code'].astype(str).str.len().sum():,} chars")
+                    st.metric("Total HTML Content", f"{stats['total_chars']:,} chars")
                     st.metric("Average per Email", f"{stats['avg_html_length']:,} chars")
-                    st.metric("Largest Email", f"{df['Complete_HTML_Code'].astype(str).str.len().max():,} chars")
-                    st.metric("Smallest Email", f"{df[df['Complete_HTML_Code'].astype(str).str.strip() != '']['Complete_HTML_Code'].astype(str).str.len().min():,} chars" if stats['completed'] > 0 else "N/A")
+                    st.metric("Largest Email", f"{stats['max_chars']:,} chars")
+                    st.metric("Smallest Email", f"{stats['min_chars']:,} chars" if stats['completed'] > 0 else "N/A")
                 
                 with overview_col2:
                     st.markdown("#### Subject Line Analysis")
@@ -1297,9 +1274,9 @@ if st.session_state.authenticated:
                 # Create timeline view
                 weeks_data = []
                 for week in range(1, 53):
-                    if week in df['Email_Number'].values:
-                        email = df[df['Email_Number'] == week].iloc[0]
-                        has_content = str(email['Complete_HTML_Code']).strip() != ''
+                    email = email_store.get(week)
+                    if email is not None:
+                        has_content = metrics.at[email.name, 'Has_Content']
                         status = "✅ Completed" if has_content else "📝 Draft"
                         weeks_data.append({
                             "Week": week,
@@ -1329,7 +1306,7 @@ if st.session_state.authenticated:
                 
                 if stats['completed'] > 0:
                     # Analyze HTML patterns
-                    completed_emails = df[df['Complete_HTML_Code'].astype(str).str.strip() != '']
+                    completed_emails = metrics[metrics['Has_Content']]
                     
                     analysis_col1, analysis_col2 = st.columns(2)
                     
@@ -1337,10 +1314,10 @@ if st.session_state.authenticated:
                         st.markdown("**HTML Structure Patterns**")
                         
                         # Count common HTML elements
-                        total_divs = completed_emails['Complete_HTML_Code'].astype(str).str.count('<div').sum()
-                        total_ps = completed_emails['Complete_HTML_Code'].astype(str).str.count('<p').sum()
-                        total_links = completed_emails['Complete_HTML_Code'].astype(str).str.count('<a ').sum()
-                        total_images = completed_emails['Complete_HTML_Code'].astype(str).str.count('<img').sum()
+                        total_divs = completed_emails['Div_Count'].sum()
+                        total_ps = completed_emails['P_Count'].sum()
+                        total_links = completed_emails['Link_Count'].sum()
+                        total_images = completed_emails['Image_Count'].sum()
                         
                         st.metric("Total <div> tags", int(total_divs))
                         st.metric("Total <p> tags", int(total_ps))
@@ -1359,16 +1336,18 @@ if st.session_state.authenticated:
                     st.markdown("---")
                     st.markdown("**HTML Quality Checks**")
                     
-                    quality_issues = 0
-                    for idx, email in completed_emails.iterrows():
-                        issues = validate_html(str(email['Complete_HTML_Code']))
-                        if not issues[0].startswith("✓"):
-                            quality_issues += 1
+                    quality_issues = stats['invalid_html']
                     
                     if quality_issues == 0:
                         st.success(f"✅ All {len(completed_emails)} completed emails passed validation!")
                     else:
                         st.warning(f"⚠️ {quality_issues} email(s) have validation issues")
+                    
+                    structure_errors = completed_emails[completed_emails['Structure_Error'] != '']
+                    if len(structure_errors) > 0:
+                        with st.expander(f"🏗️ Tag structure errors ({len(structure_errors)})"):
+                            for week, message in structure_errors[['Email_Number', 'Structure_Error']].itertuples(index=False):
+                                st.markdown(f"- **Week {week}:** {message}")
                 else:
                     st.info("Complete some newsletters to see content analysis")
             
@@ -1400,9 +1379,7 @@ if st.session_state.authenticated:
             with export_col2:
                 if st.button("📧 Export All Emails List", use_container_width=True):
                     export_df = df[['Email_Number', 'Title', 'Subject_Line']].copy()
-                    export_df['Status'] = df['Complete_HTML_Code'].apply(
-                        lambda x: 'Completed' if str(x).strip() != '' else 'Pending'
-                    )
+                    export_df['Status'] = metrics['Status']
                     csv = export_df.to_csv(index=False)
                     
                     st.download_button(
@@ -1427,7 +1404,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 - Completion Rate: {stats['completion_rate']:.1f}%
 
 ## Content Metrics
-- Total HTML Content: {df['Complete_HTML_Code'].astype(str).str.len().sum():,} characters
+- Total HTML Content: {stats['total_chars']:,} characters
 - Average HTML per Email: {stats['avg_html_length']:,} characters
 - Emails with Emojis: {sum(1 for title in df['Title'] if any(char for char in str(title) if ord(char) > 127))}
 
@@ -1437,9 +1414,9 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 ## Newsletter List
 """
-                    for idx, email in df.iterrows():
-                        status = "✅" if str(email['Complete_HTML_Code']).strip() != '' else "⏳"
-                        report += f"\n{status} Week {email['Email_Number']}: {email['Title']}"
+                    for week, title, has_content in metrics[['Email_Number', 'Title', 'Has_Content']].itertuples(index=False):
+                        status = "✅" if has_content else "⏳"
+                        report += f"\n{status} Week {week}: {title}"
                     
                     st.download_button(
                         "💾 Download Report",
@@ -1467,12 +1444,15 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                 selected_weeks = st.multiselect(
                     "Select weeks to update:",
                     options=df['Email_Number'].tolist(),
-                    format_func=lambda x: f"Week {x} - {df[df['Email_Number']==x]['Title'].iloc[0]}"
+                    format_func=lambda x: f"Week {x} - {email_store.title(x)}"
                 )
                 
                 if selected_weeks:
                     st.success(f"✅ {len(selected_weeks)} newsletters selected")
                     
+                    # All selected rows at once; index + 2 is the sheet row
+                    selected_df = df[df['Email_Number'].isin(selected_weeks)]
+                    
                     # Bulk operations
                     st.markdown("#### Choose Operation:")
                     
@@ -1486,15 +1466,13 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         
                         if st.button("Apply Prefix", type="primary"):
                             try:
-                                for week in selected_weeks:
-                                    email = df[df['Email_Number'] == week].iloc[0]
-                                    row_idx = df[df['Email_Number'] == week].index[0] + 2
-                                    new_title = prefix + email['Title']
-                                    st.session_state.worksheet.update(f'B{row_idx}', [[new_title]])
+                                batch = CellBatch(st.session_state.worksheet)
+                                batch.set_column('Title', sheet_rows(selected_df), (prefix + selected_df['Title']).tolist())
+                                requests_made = batch.commit()
                                 
-                                st.success(f"✅ Updated {len(selected_weeks)} newsletters!")
+                                st.success(f"✅ Updated {len(selected_df)} newsletters in {requests_made} request(s)!")
                                 log_activity("Bulk Update", f"Added prefix to {len(selected_weeks)} titles")
-                                st.session_state.df = None
+                                invalidate_data()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Error: {str(e)}")
@@ -1504,15 +1482,13 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         
                         if st.button("Apply Suffix", type="primary"):
                             try:
-                                for week in selected_weeks:
-                                    email = df[df['Email_Number'] == week].iloc[0]
-                                    row_idx = df[df['Email_Number'] == week].index[0] + 2
-                                    new_title = email['Title'] + suffix
-                                    st.session_state.worksheet.update(f'B{row_idx}', [[new_title]])
+                                batch = CellBatch(st.session_state.worksheet)
+                                batch.set_column('Title', sheet_rows(selected_df), (selected_df['Title'] + suffix).tolist())
+                                requests_made = batch.commit()
                                 
-                                st.success(f"✅ Updated {len(selected_weeks)} newsletters!")
+                                st.success(f"✅ Updated {len(selected_df)} newsletters in {requests_made} request(s)!")
                                 log_activity("Bulk Update", f"Added suffix to {len(selected_weeks)} titles")
-                                st.session_state.df = None
+                                invalidate_data()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"Error: {str(e)}")
@@ -1532,27 +1508,19 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         if st.button("Find and Replace", type="primary"):
                             if find_text:
                                 try:
-                                    updated_count = 0
-                                    for week in selected_weeks:
-                                        email = df[df['Email_Number'] == week].iloc[0]
-                                        row_idx = df[df['Email_Number'] == week].index[0] + 2
-                                        
-                                        if target_field == "Title":
-                                            new_value = str(email['Title']).replace(find_text, replace_text)
-                                            st.session_state.worksheet.update(f'B{row_idx}', [[new_value]])
-                                            updated_count += 1
-                                        elif target_field == "Subject_Line":
-                                            new_value = str(email['Subject_Line']).replace(find_text, replace_text)
-                                            st.session_state.worksheet.update(f'C{row_idx}', [[new_value]])
-                                            updated_count += 1
-                                        elif target_field == "Complete_HTML_Code":
-                                            new_value = str(email['Complete_HTML_Code']).replace(find_text, replace_text)
-                                            st.session_state.worksheet.update(f'D{row_idx}', [[new_value]])
-                                            updated_count += 1
+                                    old_values = selected_df[target_field].astype(str)
+                                    new_values = old_values.str.replace(find_text, replace_text, regex=False)
+                                    changed = new_values != old_values
+                                    
+                                    # Only cells that actually changed are written
+                                    batch = CellBatch(st.session_state.worksheet)
+                                    batch.set_column(target_field, sheet_rows(selected_df[changed]), new_values[changed].tolist())
+                                    updated_count = len(batch)
+                                    requests_made = batch.commit()
                                     
-                                    st.success(f"✅ Updated {updated_count} newsletters!")
+                                    st.success(f"✅ Updated {updated_count} newsletters in {requests_made} request(s)!")
                                     log_activity("Bulk Find/Replace", f"Replaced '{find_text}' in {updated_count} emails")
-                                    st.session_state.df = None
+                                    invalidate_data()
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"Error: {str(e)}")
@@ -1578,10 +1546,15 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                     
                     if export_format == "CSV (Spreadsheet)":
                         if st.button("📥 Export to CSV", type="primary"):
-                            csv_data = df.to_csv(index=False)
+                            # Serialized once per data version, shared across sessions
+                            _, artifact = export_artifact(
+                                'newsletters', email_store.version,
+                                lambda: df.to_csv(index=False).encode('utf-8'),
+                                format='csv'
+                            )
                             st.download_button(
                                 "💾 Download CSV File",
-                                csv_data,
+                                artifact['data'],
                                 "newsletters_export.csv",
                                 "text/csv",
                                 key='bulk-export-csv'
@@ -1590,10 +1563,14 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                     
                     elif export_format == "JSON (Data)":
                         if st.button("📥 Export to JSON", type="primary"):
-                            json_data = df.to_json(orient='records', indent=2)
+                            _, artifact = export_artifact(
+                                'newsletters', email_store.version,
+                                lambda: df.to_json(orient='records', indent=2).encode('utf-8'),
+                                format='json', pretty=True
+                            )
                             st.download_button(
                                 "💾 Download JSON File",
-                                json_data,
+                                artifact['data'],
                                 "newsletters_export.json",
                                 "application/json",
                                 key='bulk-export-json'
@@ -1602,8 +1579,37 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                     
                     elif export_format == "HTML (Individual Files)":
                         st.info("💡 This will create a ZIP file with individual HTML files for each newsletter")
+                        
+                        substitute_images = st.checkbox("Replace header/footer images", value=True)
+                        if substitute_images:
+                            zip_header_img = st.text_input(
+                                "Header Image URL",
+                                value="https://videmiservices.com/wp-content/uploads/2025/10/PHOTO-2025-10-06-17-20-39.jpg",
+                                key="zip_header_img"
+                            )
+                            zip_footer_img = st.text_input(
+                                "Footer Image URL",
+                                value="https://videmiservices.com/wp-content/uploads/2025/10/PHOTO-2025-10-06-17-31-56.jpg",
+                                key="zip_footer_img"
+                            )
+                        
                         if st.button("📥 Prepare HTML Export", type="primary"):
-                            st.warning("⚠️ HTML bulk export functionality requires additional setup. Use the individual export feature in the Edit tab for now.")
+                            with st.spinner("📦 Building ZIP archive..."):
+                                archive, manifest = build_html_zip(
+                                    df,
+                                    zip_header_img if substitute_images else None,
+                                    zip_footer_img if substitute_images else None
+                                )
+                            exported = sum(1 for entry in manifest if entry['File'])
+                            st.success(f"✅ Packed {exported} newsletters (+ manifest.csv)")
+                            st.download_button(
+                                "💾 Download ZIP File",
+                                archive,
+                                "newsletters_html_export.zip",
+                                "application/zip",
+                                key='bulk-export-zip'
+                            )
+                            log_activity("Export", f"Exported {exported} newsletters as HTML ZIP")
                 
                 with import_export_tabs[1]:
                     st.markdown("#### Import Newsletters from CSV")
@@ -1636,7 +1642,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                             else:
                                 # Check for duplicates with existing data
                                 existing_numbers = set(df['Email_Number'].tolist())
-                                import_numbers = set(import_df['Email_Number'].tolist())
+                                import_numbers = set(pd.to_numeric(import_df['Email_Number'], errors='coerce').dropna().astype(int).tolist())
                                 duplicates = existing_numbers.intersection(import_numbers)
                                 
                                 if duplicates:
@@ -1645,34 +1651,31 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                                 else:
                                     overwrite = False
                                 
+                                # Dry run: show exactly what the import will do before writing
+                                plan = plan_csv_upsert(df, import_df, overwrite)
+                                action_counts = plan['Action'].value_counts()
+                                
+                                st.markdown("**Dry-run diff:**")
+                                diff_col1, diff_col2, diff_col3, diff_col4 = st.columns(4)
+                                diff_col1.metric("Insert", int(action_counts.get('Insert', 0)))
+                                diff_col2.metric("Update", int(action_counts.get('Update', 0)))
+                                diff_col3.metric("Unchanged", int(action_counts.get('Unchanged', 0)))
+                                diff_col4.metric("Skip", int(action_counts.get('Skip', 0)))
+                                st.dataframe(
+                                    plan[['Email_Number', 'Title', 'Action', 'Changed_Fields']],
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+                                
                                 if st.button("🚀 Import Newsletters", type="primary"):
                                     try:
-                                        imported = 0
-                                        skipped = 0
-                                        
-                                        for idx, row in import_df.iterrows():
-                                            week_num = row['Email_Number']
-                                            
-                                            if week_num in existing_numbers and not overwrite:
-                                                skipped += 1
-                                                continue
-                                            
-                                            if week_num in existing_numbers and overwrite:
-                                                # Update existing
-                                                row_idx = df[df['Email_Number'] == week_num].index[0] + 2
-                                                st.session_state.worksheet.update(f'B{row_idx}:D{row_idx}', 
-                                                    [[row['Title'], row['Subject_Line'], row['Complete_HTML_Code']]])
-                                            else:
-                                                # Add new
-                                                st.session_state.worksheet.append_row([
-                                                    int(week_num), row['Title'], row['Subject_Line'], row['Complete_HTML_Code']
-                                                ])
-                                            
-                                            imported += 1
+                                        result = apply_csv_upsert(st.session_state.worksheet, plan)
+                                        imported = result['updated'] + result['inserted']
+                                        skipped = len(plan) - imported
                                         
-                                        st.success(f"✅ Imported {imported} newsletters! (Skipped {skipped})")
-                                        log_activity("Import", f"Imported {imported} newsletters from CSV")
-                                        st.session_state.df = None
+                                        st.success(f"✅ Imported {imported} newsletters in {result['requests']} request(s)! (Skipped {skipped})")
+                                        log_activity("Import", f"Imported {imported} newsletters from CSV ({result['inserted']} new, {result['updated']} updated)")
+                                        invalidate_data()
                                         st.balloons()
                                         st.rerun()
                                         
@@ -1692,17 +1695,16 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         st.markdown("**Create Backup**")
                         
                         if st.button("💾 Create Full Backup", type="primary", use_container_width=True):
+                            # Not cached: every backup records when it was taken
                             backup_data = {
                                 'backup_date': datetime.now().isoformat(),
                                 'total_newsletters': len(df),
                                 'data': df.to_dict('records')
                             }
                             
-                            backup_json = json.dumps(backup_data, indent=2)
-                            
                             st.download_button(
                                 "📥 Download Backup File",
-                                backup_json,
+                                json.dumps(backup_data, indent=2).encode('utf-8'),
                                 f"newsletter_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                                 "application/json",
                                 key='create-backup'
@@ -1742,7 +1744,7 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                     selected_delete = st.multiselect(
                         "Select newsletters to delete:",
                         options=df['Email_Number'].tolist(),
-                        format_func=lambda x: f"Week {x} - {df[df['Email_Number']==x]['Title'].iloc[0]}"
+                        format_func=lambda x: f"Week {x} - {email_store.title(x)}"
                     )
                     
                     if selected_delete:
@@ -1753,20 +1755,14 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         if confirm_text == "DELETE":
                             if st.button("🗑️ Confirm Delete", type="primary"):
                                 try:
-                                    # Sort in descending order to delete from bottom up
-                                    for week in sorted(selected_delete, reverse=True):
-                                        row_idx = df[df['Email_Number'] == week].index[0] + 2
-                                        st.session_state.worksheet.delete_rows(row_idx)
-                                    
-                                    st.success(f"✅ Deleted {len(selected_delete)} newsletters!")
-                                    log_activity("Bulk Delete", f"Deleted {len(selected_delete)} newsletters")
-                                    st.session_state.df = None
+                                    bulk_delete(df[df['Email_Number'].isin(selected_delete)], "selected newsletters")
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"Error: {str(e)}")
                 
                 elif delete_options == "Delete all pending":
-                    pending_count = len(df[df['Complete_HTML_Code'].astype(str).str.strip() == ''])
+                    pending_df = df[~metrics['Has_Content']]
+                    pending_count = len(pending_df)
                     
                     if pending_count > 0:
                         st.error(f"⚠️ This will delete {pending_count} pending newsletters!")
@@ -1775,7 +1771,11 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                         
                         if confirm_text == "DELETE PENDING":
                             if st.button("🗑️ Delete All Pending", type="primary"):
-                                st.info("This operation should be performed carefully. Consider exporting data first!")
+                                try:
+                                    bulk_delete(pending_df, "pending newsletters")
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"Error: {str(e)}")
                     else:
                         st.success("✅ No pending newsletters to delete!")
                 
@@ -1799,7 +1799,11 @@ Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
                             
                             if confirm_text == "DELETE RANGE":
                                 if st.button("🗑️ Delete Range", type="primary"):
-                                    st.info("Range delete should be implemented with caution. Export your data first!")
+                                    try:
+                                        bulk_delete(affected, f"newsletters (Weeks {start_week}-{end_week})")
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"Error: {str(e)}")
             
             st.markdown('</div>', unsafe_allow_html=True)
     
@@ -2,9 +2,17 @@ import streamlit as st
 import json
 from datetime import datetime, timedelta
 from typing import List, Dict
-import re
 from collections import Counter
 
+import pandas as pd
+
+from email_metrics import ANALYSIS_CACHE, SequenceMetrics
+from html_tools import extract_content
+from validation import ERROR, validate_emails
+from exports import export_artifact
+from sequence_store import EmailSequence, render_template
+from scheduler import parse_dates, project_volume, schedule_sends, signup_distribution
+
 st.set_page_config(page_title="VIDeMI Email Sequence Builder", page_icon="📧", layout="wide")
 
 # Custom CSS
@@ -448,119 +456,65 @@ EMAIL_TEMPLATES = {
     }
 }
 
-def analyze_email_content(content: str) -> Dict:
+def compute_email_stats(content: str) -> Dict:
     """Analyze email content and return statistics"""
-    # Remove HTML tags for text analysis
-    text = re.sub(r'<[^>]+>', '', content)
-    
-    words = text.split()
-    word_count = len(words)
-    char_count = len(text)
-    
-    # Count links
-    links = re.findall(r'href="[^"]*"', content)
-    link_count = len(links)
-    
-    # Count images
-    images = re.findall(r'<img[^>]*>', content)
-    image_count = len(images)
+    # Visible text only: markup, styles, scripts and comments are not words
+    extracted = extract_content(content)
+    word_count = extracted['word_count']
     
     # Estimate reading time (average 200 words per minute)
-    reading_time = max(1, round(word_count / 200))
+    reading_time = max(1, round(extracted['reading_time']))
     
     return {
         "word_count": word_count,
-        "char_count": char_count,
-        "link_count": link_count,
-        "image_count": image_count,
+        "char_count": len(extracted['text']),
+        "link_count": len(extracted['links']),
+        "image_count": len(extracted['images']),
         "reading_time": reading_time
     }
 
+def analyze_email_content(content: str) -> Dict:
+    """Email content statistics, memoized per body in a bounded LRU"""
+    return dict(ANALYSIS_CACHE.get_or_compute(content or '', compute_email_stats))
+
+def sequence_stats(sequence: List[Dict]) -> List[Dict]:
+    """Content statistics for every email, re-analysing only bodies that changed"""
+    if 'sequence_metrics' not in st.session_state:
+        st.session_state.sequence_metrics = SequenceMetrics(analyze_email_content)
+    return st.session_state.sequence_metrics.sync([sequence.body(e) for e in sequence])
+
 def validate_email(email: Dict) -> List[str]:
     """Validate email and return list of warnings"""
-    warnings = []
-    
-    if not email.get('subject'):
-        warnings.append("Missing subject line")
-    elif len(email['subject']) > 100:
-        warnings.append("Subject line is too long (>100 characters)")
-    elif len(email['subject']) < 10:
-        warnings.append("Subject line is too short (<10 characters)")
-    
-    if not email.get('email_body'):
-        warnings.append("Missing email body")
-    else:
-        stats = analyze_email_content(email['email_body'])
-        if stats['word_count'] < 50:
-            warnings.append("Email content is very short (<50 words)")
-        if stats['word_count'] > 1000:
-            warnings.append("Email content is very long (>1000 words)")
-    
-    if email.get('delay', 0) < 0:
-        warnings.append("Delay cannot be negative")
-    
-    return warnings
+    email = st.session_state.sequence.email_json(email)
+    return [result['message'] for result in validate_emails([email])[0]]
 
-def calculate_send_dates(sequence: List[Dict], start_date: datetime = None) -> List[Dict]:
+def calculate_send_dates(sequence: List[Dict], start_date: datetime = None, business_days: bool = False,
+                        blackout_dates=None) -> List[Dict]:
     """Calculate when each email will be sent"""
     if start_date is None:
         start_date = datetime.now()
     
-    schedule = []
-    for email in sequence:
-        send_date = start_date + timedelta(days=email.get('delay', 0))
-        schedule.append({
-            "email_id": email.get('id'),
-            "subject": email.get('subject'),
-            "send_date": send_date.strftime("%Y-%m-%d"),
-            "days_from_start": email.get('delay', 0)
-        })
-    
-    return schedule
+    schedule = schedule_sends(
+        [e.get('delay', 0) for e in sequence],
+        [start_date],
+        business_days=business_days,
+        blackout_dates=blackout_dates
+    )
+    return pd.DataFrame({
+        "email_id": [e.get('id') for e in sequence],
+        "subject": [e.get('subject') for e in sequence],
+        "send_date": schedule['Send_Date'].dt.strftime("%Y-%m-%d"),
+        "weekday": schedule['Day_Of_Week'].astype(str),
+        "days_from_start": schedule['Days_From_Start']
+    }).to_dict('records')
 
 def create_email_html_template(content: str, header_img: str, footer_img: str) -> str:
     """Create a properly formatted HTML email template"""
-    return f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>VIDeMI Services</title>
-</head>
-<body style="margin: 0; padding: 0; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; background-color: #f4f4f4;">
-    <table role="presentation" style="width: 100%; border-collapse: collapse;">
-        <tr>
-            <td align="center" style="padding: 0;">
-                <table role="presentation" style="width: 600px; border-collapse: collapse; background-color: #ffffff; margin: 20px auto;">
-                    <tr>
-                        <td style="padding: 0;">
-                            <div class="header-image">
-                                <img src="{header_img}" alt="VIDeMI Services Header" style="width: 100%; height: auto; display: block; border: 0;">
-                            </div>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 40px 30px;">
-                            {content}
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 0;">
-                            <div class="footer-image">
-                                <img src="{footer_img}" alt="VIDeMI Services Footer" style="width: 100%; height: auto; display: block; border: 0;">
-                            </div>
-                        </td>
-                    </tr>
-                </table>
-            </td>
-        </tr>
-    </table>
-</body>
-</html>'''
+    return render_template(content, header_img, footer_img)
 
-def create_email_sequence(num_emails: int, start_id: int = 1) -> List[Dict]:
+def create_email_sequence(num_emails: int, start_id: int = 1) -> EmailSequence:
     """Create a complete email sequence"""
-    sequence = []
+    sequence = EmailSequence()
     
     template_keys = list(EMAIL_TEMPLATES.keys())
     
@@ -597,15 +551,13 @@ def create_email_sequence(num_emails: int, start_id: int = 1) -> List[Dict]:
         email = {
             "id": start_id + i,
             "subject": subject,
-            "email_body": create_email_html_template(
-                content,
-                DEFAULT_HEADER_IMAGE,
-                DEFAULT_FOOTER_IMAGE
-            ),
+            "content": content,
+            "header_img": DEFAULT_HEADER_IMAGE,
+            "footer_img": DEFAULT_FOOTER_IMAGE,
             "delay": delay,
             "status": "active"
         }
-        sequence.append(email)
+        sequence.add(email)
     
     return sequence
 
@@ -641,8 +593,7 @@ with st.sidebar:
             import io
             csv_buffer = io.StringIO()
             csv_buffer.write("ID,Subject,Delay (days),Status,Word Count\n")
-            for email in st.session_state.sequence:
-                stats = analyze_email_content(email.get('email_body', ''))
+            for email, stats in zip(st.session_state.sequence, sequence_stats(st.session_state.sequence)):
                 csv_buffer.write(f"{email.get('id')},{email.get('subject')},{email.get('delay')},{email.get('status')},{stats['word_count']}\n")
             
             st.download_button(
@@ -684,7 +635,7 @@ with tab1:
             
             if uploaded_file is not None:
                 try:
-                    sequence = json.load(uploaded_file)
+                    sequence = EmailSequence.from_json(json.load(uploaded_file))
                     st.session_state.sequence = sequence
                     st.success(f"✅ Loaded {len(sequence)} emails!")
                     st.rerun()
@@ -700,21 +651,20 @@ with tab1:
                 new_email = {
                     "id": new_id,
                     "subject": f"New Email {new_id}",
-                    "email_body": create_email_html_template(
-                        "<h1>New Email</h1><p>Edit this content...</p>",
-                        header_img,
-                        footer_img
-                    ),
+                    "content": "<h1>New Email</h1><p>Edit this content...</p>",
+                    "header_img": header_img,
+                    "footer_img": footer_img,
                     "delay": 0,
                     "status": "active"
                 }
-                st.session_state.sequence.append(new_email)
+                st.session_state.sequence.add(new_email)
                 st.success("✅ Added new email!")
                 st.rerun()
             
             if st.button("🔄 Duplicate Selected", use_container_width=True):
                 if 'selected_email_idx' in st.session_state:
                     idx = st.session_state.selected_email_idx
+                    # The copy shares the original's body blobs
                     original = st.session_state.sequence[idx].copy()
                     new_id = max([e.get('id', 0) for e in st.session_state.sequence]) + 1
                     original['id'] = new_id
@@ -727,6 +677,7 @@ with tab1:
                 if 'selected_email_idx' in st.session_state and len(st.session_state.sequence) > 1:
                     idx = st.session_state.selected_email_idx
                     del st.session_state.sequence[idx]
+                    st.session_state.sequence.compact()
                     st.success("✅ Deleted email!")
                     st.rerun()
                 else:
@@ -756,6 +707,7 @@ with tab1:
             
             email = filtered_sequence[selected_email_idx]
             actual_idx = st.session_state.sequence.index(email)
+            email_stats = sequence_stats(st.session_state.sequence)[actual_idx]
             
             # Validation warnings
             warnings = validate_email(email)
@@ -779,9 +731,8 @@ with tab1:
                         email['status'] = st.selectbox("Status", options=["active", "inactive", "draft"], 
                                                       index=["active", "inactive", "draft"].index(email.get('status', 'active')))
                     
-                    # Extract content from HTML
-                    content_match = re.search(r'<td style="padding: 40px 30px;">(.*?)</td>', email.get('email_body', ''), re.DOTALL)
-                    current_content = content_match.group(1).strip() if content_match else ""
+                    # Content is stored separately from the template chrome
+                    current_content = email.get('content', '').strip()
                     
                     st.markdown("**Email Content (HTML)**")
                     new_content = st.text_area(
@@ -796,8 +747,9 @@ with tab1:
                     
                     with col1:
                         if st.form_submit_button("💾 Save Changes", type="primary", use_container_width=True):
-                            email['email_body'] = create_email_html_template(new_content, header_img, footer_img)
+                            st.session_state.sequence.set_content(email, new_content, header_img, footer_img)
                             st.session_state.sequence[actual_idx] = email
+                            st.session_state.sequence.compact()
                             st.success("✅ Email updated!")
                             st.rerun()
                     
@@ -810,7 +762,7 @@ with tab1:
                             st.session_state.show_preview = actual_idx
             
             with edit_tab2:
-                stats = analyze_email_content(email.get('email_body', ''))
+                stats = email_stats
                 
                 col1, col2, col3, col4 = st.columns(4)
                 col1.metric("Words", stats['word_count'])
@@ -830,11 +782,12 @@ with tab1:
                     st.success(f"📧 Subject line length is optimal ({subject_len} chars)")
             
             with edit_tab3:
+                email_body = st.session_state.sequence.body(email)
                 st.markdown("**HTML Preview:**")
-                st.code(email.get('email_body', ''), language='html', line_numbers=True)
+                st.code(email_body, language='html', line_numbers=True)
                 
                 st.markdown("**Rendered Preview:**")
-                st.markdown(email.get('email_body', ''), unsafe_allow_html=True)
+                st.markdown(email_body, unsafe_allow_html=True)
         else:
             st.info("No emails match your search")
 
@@ -871,17 +824,19 @@ with tab2:
                 with col2:
                     if st.button(f"➕ Use Template", key=f"use_{key}", use_container_width=True):
                         if 'sequence' not in st.session_state:
-                            st.session_state.sequence = []
+                            st.session_state.sequence = EmailSequence()
                         
                         new_id = max([e.get('id', 0) for e in st.session_state.sequence], default=0) + 1
                         new_email = {
                             "id": new_id,
                             "subject": template['subject'],
-                            "email_body": create_email_html_template(template['content'], header_img, footer_img),
+                            "content": template['content'],
+                            "header_img": header_img,
+                            "footer_img": footer_img,
                             "delay": len(st.session_state.sequence),
                             "status": "active"
                         }
-                        st.session_state.sequence.append(new_email)
+                        st.session_state.sequence.add(new_email)
                         st.success(f"✅ Added '{template['name']}' to sequence!")
                         st.rerun()
     
@@ -906,6 +861,8 @@ with tab3:
     
     if 'sequence' in st.session_state and st.session_state.sequence:
         seq = st.session_state.sequence
+        seq_stats = sequence_stats(seq)
+        seq_metrics = st.session_state.sequence_metrics
         
         # Overview metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -928,7 +885,7 @@ with tab3:
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col4:
-            total_words = sum([analyze_email_content(e.get('email_body', ''))['word_count'] for e in seq])
+            total_words = int(seq_metrics.totals['word_count'])
             st.markdown('<div class="stat-card">', unsafe_allow_html=True)
             st.metric("Total Words", f"{total_words:,}")
             st.markdown('</div>', unsafe_allow_html=True)
@@ -941,9 +898,7 @@ with tab3:
         with col1:
             st.subheader("Email Statistics")
             
-            for email in seq:
-                stats = analyze_email_content(email.get('email_body', ''))
-                
+            for email, stats in zip(seq, seq_stats):
                 with st.expander(f"#{email.get('id')} - {email.get('subject')[:40]}..."):
                     col_a, col_b = st.columns(2)
                     col_a.metric("Words", stats['word_count'])
@@ -959,8 +914,7 @@ with tab3:
             st.subheader("Content Distribution")
             
             # Word count distribution
-            word_counts = [analyze_email_content(e.get('email_body', ''))['word_count'] for e in seq]
-            avg_words = sum(word_counts) / len(word_counts) if word_counts else 0
+            avg_words = seq_metrics.average('word_count')
             
             st.metric("Average Words per Email", f"{avg_words:.0f}")
             
@@ -992,11 +946,19 @@ with tab4:
         
         with col1:
             start_date = st.date_input("Sequence Start Date", value=datetime.now())
+            business_days = st.checkbox("Business days only", help="Count delays as working days (Mon-Fri)")
+            blackout_text = st.text_area("Blackout Dates", placeholder="2025-12-25, 2026-01-01",
+                                         help="Sends on these dates move to the next free day")
             
             if st.button("📅 Calculate Schedule", type="primary", use_container_width=True):
+                blackout_dates, invalid_dates = parse_dates(blackout_text)
+                if invalid_dates:
+                    st.warning(f"⚠️ Ignored invalid dates: {', '.join(invalid_dates)}")
                 st.session_state.schedule = calculate_send_dates(
                     st.session_state.sequence,
-                    datetime.combine(start_date, datetime.min.time())
+                    datetime.combine(start_date, datetime.min.time()),
+                    business_days=business_days,
+                    blackout_dates=blackout_dates
                 )
         
         with col2:
@@ -1007,7 +969,7 @@ with tab4:
                     st.markdown(f"""
                     <div class="email-card">
                         <strong>Email #{item['email_id']}</strong>: {item['subject']}<br>
-                        <span style="color: #667eea;">📅 {item['send_date']}</span> 
+                        <span style="color: #667eea;">📅 {item['send_date']} ({item['weekday']})</span> 
                         <span style="color: #999;">({item['days_from_start']} days from start)</span>
                     </div>
                     """, unsafe_allow_html=True)
@@ -1021,6 +983,54 @@ with tab4:
                     file_name=f"email_schedule_{start_date}.json",
                     mime="application/json"
                 )
+        
+        st.divider()
+        st.subheader("📈 Send Volume Forecast")
+        st.markdown("Project daily sends when new subscribers join the sequence every day")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        signups_from = col1.date_input("Signups From", value=start_date, key="forecast_from")
+        signups_until = col2.date_input("Signups Until", value=start_date + timedelta(days=90), key="forecast_until")
+        daily_signups = col3.number_input("Subscribers per Day", min_value=0, value=50, step=10)
+        send_limit = col4.number_input("ESP Daily Limit", min_value=0, value=0, step=100, help="0 = no limit")
+        
+        if st.button("📈 Forecast Send Volume", use_container_width=True):
+            delays = [e.get('delay', 0) for e in st.session_state.sequence]
+            if signups_until < signups_from:
+                st.error("❌ The signup range ends before it starts")
+            elif min(delays) < 0:
+                st.error("❌ Delays cannot be negative")
+            else:
+                forecast = project_volume(
+                    signup_distribution(signups_from, signups_until, daily_signups),
+                    delays,
+                    business_days=business_days,
+                    blackout_dates=parse_dates(blackout_text)[0],
+                    by_email=True,
+                    names=[f"#{e.get('id')}" for e in st.session_state.sequence]
+                )
+                
+                st.line_chart(forecast['Sends'])
+                
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Peak Day", forecast['Sends'].idxmax().strftime("%Y-%m-%d"))
+                col2.metric("Peak Sends", f"{int(forecast['Sends'].max()):,}")
+                col3.metric("Total Sends", f"{int(forecast['Sends'].sum()):,}")
+                
+                if send_limit:
+                    over_limit = forecast[forecast['Sends'] > send_limit]
+                    if len(over_limit):
+                        st.warning(f"⚠️ {len(over_limit)} day(s) exceed {send_limit:,} sends, "
+                                   f"first on {over_limit.index[0].strftime('%Y-%m-%d')}")
+                    else:
+                        st.success(f"✅ Every day stays within {send_limit:,} sends")
+                
+                st.download_button(
+                    label="📥 Download Forecast (CSV)",
+                    data=forecast.to_csv(date_format="%Y-%m-%d"),
+                    file_name=f"send_forecast_{signups_from}.csv",
+                    mime="text/csv"
+                )
     else:
         st.info("📭 No sequence loaded. Create or load a sequence to calculate schedule.")
 
@@ -1076,13 +1086,13 @@ with tab5:
             if st.button("🔍 Run Full Validation", type="primary", use_container_width=True):
                 st.session_state.validation_results = []
                 
-                for email in st.session_state.sequence:
-                    warnings = validate_email(email)
-                    if warnings:
+                sequence = st.session_state.sequence
+                for email, findings in zip(sequence, validate_emails(sequence.to_json())):
+                    if findings:
                         st.session_state.validation_results.append({
                             "email_id": email.get('id'),
                             "subject": email.get('subject'),
-                            "warnings": warnings
+                            "findings": findings
                         })
             
             if 'validation_results' in st.session_state:
@@ -1091,8 +1101,9 @@ with tab5:
                     
                     for result in st.session_state.validation_results:
                         with st.expander(f"Email #{result['email_id']}: {result['subject'][:40]}..."):
-                            for warning in result['warnings']:
-                                st.write(f"• {warning}")
+                            for item in result['findings']:
+                                icon = "❌" if item['severity'] == ERROR else "⚠️"
+                                st.write(f"{icon} {item['message']} `{item['rule']}`")
                 else:
                     st.success("✅ All emails passed validation!")
         else:
@@ -1100,13 +1111,25 @@ with tab5:
         
         st.divider()
         
+        st.subheader("⚡ Analysis Cache")
+        st.caption("Shared by every session on this server")
+        cache_stats = ANALYSIS_CACHE.stats
+        lookups = cache_stats['hits'] + cache_stats['misses']
+        col_a, col_b, col_c = st.columns(3)
+        col_a.metric("Hits", cache_stats['hits'])
+        col_b.metric("Misses", cache_stats['misses'])
+        col_c.metric("Hit Rate", f"{(cache_stats['hits'] / lookups * 100) if lookups else 0:.1f}%")
+        st.caption(f"{len(ANALYSIS_CACHE)}/{ANALYSIS_CACHE.max_entries} cached emails (all sessions) · {cache_stats['evictions']} evictions")
+        
+        st.divider()
+        
         st.subheader("💾 Backup & Restore")
         
         if 'sequence' in st.session_state and st.session_state.sequence:
             if st.button("💾 Create Backup", use_container_width=True):
                 backup_data = {
                     "timestamp": datetime.now().isoformat(),
-                    "sequence": st.session_state.sequence
+                    "sequence": st.session_state.sequence.to_json()
                 }
                 backup_json = json.dumps(backup_data, indent=2)
                 st.download_button(
@@ -1131,10 +1154,15 @@ if 'sequence' in st.session_state and st.session_state.sequence:
     
     with col3:
         st.write("")  # Spacing
-        json_str = json.dumps(st.session_state.sequence, indent=2 if indent else None)
+        # Re-serialized only when the sequence or the format changes
+        _, sequence_export = export_artifact(
+            'sequence', st.session_state.sequence.version,
+            lambda: json.dumps(st.session_state.sequence.to_json(), indent=2 if indent else None).encode('utf-8'),
+            pretty=indent
+        )
         st.download_button(
             label="📥 Download JSON",
-            data=json_str,
+            data=sequence_export['data'],
             file_name=filename,
             mime="application/json",
             type="primary",
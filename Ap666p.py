@@ -6,6 +6,9 @@ import re
 from collections import Counter
 import streamlit.components.v1 as components
 
+from html_tools import extract_content, replace_header_footer_images
+from sequence_store import render_template
+
 st.set_page_config(page_title="VIDeMI Email Sequence Builder", page_icon="📧", layout="wide")
 
 # Custom CSS
@@ -451,29 +454,18 @@ EMAIL_TEMPLATES = {
 
 def analyze_email_content(content: str) -> Dict:
     """Analyze email content and return statistics"""
-    # Remove HTML tags for text analysis
-    text = re.sub(r'<[^>]+>', '', content)
-    
-    words = text.split()
-    word_count = len(words)
-    char_count = len(text)
-    
-    # Count links
-    links = re.findall(r'href="[^"]*"', content)
-    link_count = len(links)
-    
-    # Count images
-    images = re.findall(r'<img[^>]*>', content)
-    image_count = len(images)
+    # Visible text only: markup, styles, scripts and comments are not words
+    extracted = extract_content(content)
+    word_count = extracted['word_count']
     
     # Estimate reading time (average 200 words per minute)
-    reading_time = max(1, round(word_count / 200))
+    reading_time = max(1, round(extracted['reading_time']))
     
     return {
         "word_count": word_count,
-        "char_count": char_count,
-        "link_count": link_count,
-        "image_count": image_count,
+        "char_count": len(extracted['text']),
+        "link_count": len(extracted['links']),
+        "image_count": len(extracted['images']),
         "reading_time": reading_time
     }
 
@@ -521,43 +513,7 @@ def calculate_send_dates(sequence: List[Dict], start_date: datetime = None) -> L
 
 def create_email_html_template(content: str, header_img: str, footer_img: str) -> str:
     """Create a properly formatted HTML email template"""
-    return f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>VIDeMI Services</title>
-</head>
-<body style="margin: 0; padding: 0; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; background-color: #f4f4f4;">
-    <table role="presentation" style="width: 100%; border-collapse: collapse;">
-        <tr>
-            <td align="center" style="padding: 0;">
-                <table role="presentation" style="width: 600px; border-collapse: collapse; background-color: #ffffff; margin: 20px auto;">
-                    <tr>
-                        <td style="padding: 0;">
-                            <div class="header-image">
-                                <img src="{header_img}" alt="VIDeMI Services Header" style="width: 100%; height: auto; display: block; border: 0;">
-                            </div>
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 40px 30px;">
-                            {content}
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 0;">
-                            <div class="footer-image">
-                                <img src="{footer_img}" alt="VIDeMI Services Footer" style="width: 100%; height: auto; display: block; border: 0;">
-                            </div>
-                        </td>
-                    </tr>
-                </table>
-            </td>
-        </tr>
-    </table>
-</body>
-</html>'''
+    return render_template(content, header_img, footer_img)
 
 def create_email_sequence(num_emails: int, start_id: int = 1) -> List[Dict]:
     """Create a complete email sequence"""
@@ -640,6 +596,8 @@ with st.sidebar:
         try:
             import gspread
             from google.oauth2.service_account import Credentials
+            from sheets_loader import load_email_frame
+            from sheets_cache import SHEET_CACHE
             GSPREAD_AVAILABLE = True
         except ImportError:
             GSPREAD_AVAILABLE = False
@@ -707,57 +665,46 @@ with st.sidebar:
                             )
                             client = gspread.authorize(creds)
                             
-                            # Open the spreadsheet
-                            spreadsheet = client.open_by_key(st.session_state.spreadsheet_id)
-                            
-                            # Get the specific worksheet by gid if available
-                            if 'gid' in st.session_state:
-                                worksheet = spreadsheet.get_worksheet_by_id(int(st.session_state.gid))
-                            else:
-                                worksheet = spreadsheet.sheet1
-                            
-                            # Get all values including headers
-                            all_values = worksheet.get_all_values()
-                            
-                            if not all_values or len(all_values) < 2:
-                                st.error("❌ Sheet is empty or has no data rows")
-                                raise Exception("Sheet is empty")
-                            
-                            # First row is headers
-                            headers = all_values[0]
-                            data_rows = all_values[1:]
+                            def fetch_sheet():
+                                # Open the spreadsheet
+                                spreadsheet = client.open_by_key(st.session_state.spreadsheet_id)
+                                
+                                # Get the specific worksheet by gid if available
+                                if 'gid' in st.session_state:
+                                    worksheet = spreadsheet.get_worksheet_by_id(int(st.session_state.gid))
+                                else:
+                                    worksheet = spreadsheet.sheet1
+                                
+                                # Fetch only the newsletter columns in a single request
+                                return load_email_frame(worksheet, strict=True)
                             
-                            # Find column indices
+                            # Shared cache: only re-pulls when the sheet's revision changed
                             try:
-                                email_number_idx = headers.index('Email_Number')
-                                title_idx = headers.index('Title')
-                                subject_idx = headers.index('Subject_Line')
-                                html_idx = headers.index('Complete_HTML_Code')
+                                df = SHEET_CACHE.get(
+                                    client,
+                                    st.session_state.spreadsheet_id,
+                                    st.session_state.get('gid'),
+                                    fetch_sheet
+                                )
                             except ValueError as e:
-                                st.error(f"❌ Missing required column: {str(e)}")
+                                st.error(f"❌ {str(e)}")
                                 st.info("Required columns: Email_Number, Title, Subject_Line, Complete_HTML_Code")
                                 raise
                             
+                            # Skip empty rows
+                            df = df[(df['Email_Number'] != 0) & (df['Subject_Line'] != '')]
+                            
+                            if len(df) == 0:
+                                st.error("❌ Sheet is empty or has no data rows")
+                                raise Exception("Sheet is empty")
+                            
                             # Convert to email sequence format
                             sequence = []
-                            for row in data_rows:
-                                # Skip if row doesn't have enough columns
-                                if len(row) <= max(email_number_idx, title_idx, subject_idx, html_idx):
-                                    continue
-                                
-                                try:
-                                    email_number = int(row[email_number_idx]) if row[email_number_idx] else 0
-                                except (ValueError, IndexError):
-                                    continue
-                                
-                                title = row[title_idx] if len(row) > title_idx else ''
-                                subject_line = row[subject_idx] if len(row) > subject_idx else ''
-                                complete_html = row[html_idx] if len(row) > html_idx else ''
-                                
-                                # Skip empty rows
-                                if not email_number or not subject_line:
-                                    continue
-                                
+                            for email_number, subject_line, complete_html in zip(
+                                df['Email_Number'].tolist(),
+                                df['Subject_Line'].tolist(),
+                                df['Complete_HTML_Code'].tolist()
+                            ):
                                 # Calculate delay based on email number
                                 if email_number == 1:
                                     delay = 0
@@ -775,37 +722,10 @@ with st.sidebar:
                                     # It's already a complete HTML document, use as-is
                                     email_body = complete_html
                                     
-                                    # Update header image if it exists in the HTML
-                                    if 'header-image' in email_body or 'Header' in email_body:
-                                        email_body = re.sub(
-                                            r'(<img[^>]*src=")[^"]*("[^>]*alt="[^"]*[Hh]eader[^"]*")',
-                                            f'\\1{header_img}\\2',
-                                            email_body,
-                                            flags=re.DOTALL
-                                        )
-                                        # Also try class-based matching
-                                        email_body = re.sub(
-                                            r'(<div class="header-image">.*?<img[^>]*src=")[^"]*(")',
-                                            f'\\1{header_img}\\2',
-                                            email_body,
-                                            flags=re.DOTALL
-                                        )
-                                    
-                                    # Update footer image if it exists in the HTML
-                                    if 'footer-image' in email_body or 'Footer' in email_body:
-                                        email_body = re.sub(
-                                            r'(<img[^>]*src=")[^"]*("[^>]*alt="[^"]*[Ff]ooter[^"]*")',
-                                            f'\\1{footer_img}\\2',
-                                            email_body,
-                                            flags=re.DOTALL
-                                        )
-                                        # Also try class-based matching
-                                        email_body = re.sub(
-                                            r'(<div class="footer-image">.*?<img[^>]*src=")[^"]*(")',
-                                            f'\\1{footer_img}\\2',
-                                            email_body,
-                                            flags=re.DOTALL
-                                        )
+                                    # Point the header/footer images at the sidebar URLs
+                                    email_body = replace_header_footer_images(
+                                        email_body, header_img, footer_img, match_alt=True
+                                    )
                                 else:
                                     # It's just content, wrap it with template
                                     email_body = create_email_html_template(
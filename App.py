@@ -2,10 +2,16 @@ import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 import json
-import re
 from datetime import datetime, timedelta
 import gspread
 from google.oauth2.service_account import Credentials
+from sheets_loader import open_worksheet, load_email_frame
+from sheets_cache import SHEET_CACHE
+from email_store import EmailStore
+from html_tools import render_email_html
+from library_view import query_library, page_controls, show_search_hits
+from exports import ARTIFACT_CACHE, sequence_json_export, stamp_export
+from scheduler import parse_dates, project_volume, schedule_sends, signup_distribution
 
 # Page configuration
 st.set_page_config(
@@ -49,6 +55,8 @@ if 'service_account_info' not in st.session_state:
     st.session_state.service_account_info = None
 if 'df' not in st.session_state:
     st.session_state.df = None
+if 'email_store' not in st.session_state:
+    st.session_state.email_store = None
 
 # Activity logging function
 def log_activity(action, details):
@@ -59,24 +67,6 @@ def log_activity(action, details):
         'details': details
     })
 
-def replace_header_footer_images(html_content, header_url, footer_url):
-    """
-    Replace header and footer image URLs in HTML content with specified URLs.
-    Looks for images within header-image and footer-image divs.
-    """
-    if not html_content or html_content == 'nan':
-        return html_content
-    
-    # Replace header image - find img src within header-image div
-    header_pattern = r'(<div[^>]*class=["\']header-image["\'][^>]*>.*?<img[^>]*src=["\'])([^"\']+)(["\'][^>]*>.*?</div>)'
-    html_content = re.sub(header_pattern, r'\1' + header_url + r'\3', html_content, flags=re.DOTALL | re.IGNORECASE)
-    
-    # Replace footer image - find img src within footer-image div
-    footer_pattern = r'(<div[^>]*class=["\']footer-image["\'][^>]*>.*?<img[^>]*src=["\'])([^"\']+)(["\'][^>]*>.*?</div>)'
-    html_content = re.sub(footer_pattern, r'\1' + footer_url + r'\3', html_content, flags=re.DOTALL | re.IGNORECASE)
-    
-    return html_content
-
 # Header
 st.markdown('<div class="main-header">📧 VIDeMI Email Newsletter Manager</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Manage your 52-week email sequence with ease</div>', unsafe_allow_html=True)
@@ -177,47 +167,20 @@ with st.sidebar:
                     # Connect to Google Sheets
                     client = gspread.authorize(creds)
                     
-                    # Open spreadsheet
-                    spreadsheet = client.open_by_key(spreadsheet_id)
-                    
-                    # Get worksheet by ID
-                    worksheet = None
-                    for sheet in spreadsheet.worksheets():
-                        if str(sheet.id) == sheet_id:
-                            worksheet = sheet
-                            break
-                    
-                    if not worksheet:
-                        worksheet = spreadsheet.get_worksheet(0)
-                    
-                    # Get all values (to avoid truncation)
-                    all_values = worksheet.get_all_values()
+                    # Shared cache: only re-pulls when the sheet's revision changed
+                    df = SHEET_CACHE.get(
+                        client, spreadsheet_id, sheet_id,
+                        lambda: load_email_frame(open_worksheet(client, spreadsheet_id, sheet_id))
+                    )
                     
-                    if len(all_values) < 2:
+                    if len(df) == 0:
                         st.error("❌ Sheet is empty or has no data rows!")
                     else:
-                        # First row is headers
-                        headers = all_values[0]
-                        data_rows = all_values[1:]
-                        
-                        # Create dataframe
-                        df = pd.DataFrame(data_rows, columns=headers)
-                        
-                        # Convert Email_Number to int
-                        df['Email_Number'] = pd.to_numeric(df['Email_Number'], errors='coerce')
-                        df = df.dropna(subset=['Email_Number'])
-                        df['Email_Number'] = df['Email_Number'].astype(int)
-                        
-                        # Sort by email number
-                        df = df.sort_values('Email_Number')
-                        
-                        if 'Complete_HTML_Code' in df.columns:
-                            df['Complete_HTML_Code'] = df['Complete_HTML_Code'].apply(
-                                lambda html: replace_header_footer_images(html, header_img, footer_img)
-                            )
-                        
-                        # Store in session state
+                        # The frame is shared across sessions and keeps the sheet's HTML as-is;
+                        # header/footer images are applied when an email is previewed or exported
+                        # Store in session state (week index is built once per load)
                         st.session_state.df = df
+                        st.session_state.email_store = EmailStore(df, source=(spreadsheet_id, sheet_id))
                         
                         st.success(f"✅ Loaded {len(df)} emails from Google Sheets!")
                         log_activity("Google Sheets", f"Loaded {len(df)} emails")
@@ -252,6 +215,8 @@ if st.session_state.df is None:
     """)
 else:
     df = st.session_state.df
+    email_store = st.session_state.email_store
+    metrics = email_store.metrics
     
     st.markdown("---")
     
@@ -270,34 +235,42 @@ else:
         
         col1, col2, col3 = st.columns([2, 1, 1])
         with col1:
-            search_term = st.text_input("🔍 Search emails", placeholder="Search by title or subject...")
+            search_term = st.text_input("🔍 Search emails", placeholder='Search titles, subjects and content ("quotes" for phrases)...')
         with col2:
             filter_status = st.selectbox("Filter by status", ["All", "Has Content", "Empty"])
         with col3:
             sort_by = st.selectbox("Sort by", ["Email Number", "Title"])
         
-        # Filter dataframe
-        filtered_df = df.copy()
+        # Filter and sort on index labels, then render only the visible page
+        search_mask = None
         if search_term:
-            filtered_df = filtered_df[
-                filtered_df['Title'].str.contains(search_term, case=False, na=False) |
-                filtered_df['Subject_Line'].str.contains(search_term, case=False, na=False)
-            ]
+            matches = email_store.search(search_term)
+            if matches is not None:
+                search_mask = df.index.isin(list(matches))
+        
+        rows = query_library(
+            df, metrics,
+            search_mask=search_mask,
+            has_content={"Has Content": True, "Empty": False}.get(filter_status),
+            sort_by={"Email Number": 'Email_Number', "Title": 'Title'}[sort_by]
+        )
         
-        if filter_status == "Has Content":
-            filtered_df = filtered_df[filtered_df['Complete_HTML_Code'].notna() & (filtered_df['Complete_HTML_Code'] != '')]
-        elif filter_status == "Empty":
-            filtered_df = filtered_df[filtered_df['Complete_HTML_Code'].isna() | (filtered_df['Complete_HTML_Code'] == '')]
+        st.markdown(f"**Showing {len(rows)} of {len(df)} emails**")
         
-        st.markdown(f"**Showing {len(filtered_df)} of {len(df)} emails**")
+        if search_term:
+            visible = set(rows)
+            hits = [hit for hit in email_store.rank(search_term) if hit['doc_id'] in visible]
+            with st.expander(f"🔎 Best matches for \"{search_term}\"", expanded=True):
+                show_search_hits(hits[:10], label="Email #")
+        start, end = page_controls(len(rows), key="library")
         st.markdown("---")
         
-        for idx, row in filtered_df.iterrows():
+        for idx, row in df.loc[rows[start:end]].iterrows():
             email_num = int(row['Email_Number'])
             title = str(row['Title'])
             subject = str(row['Subject_Line'])
             html_code = str(row['Complete_HTML_Code']).strip()
-            has_content = bool(html_code and html_code != 'nan')
+            has_content = metrics.at[idx, 'Has_Content']
             
             with st.expander(f"📧 Email #{email_num}: {title}", expanded=False):
                 col1, col2 = st.columns([3, 1])
@@ -306,8 +279,8 @@ else:
                     st.markdown(f"**Subject:** {subject}")
                     st.markdown(f"**Status:** {'✅ Has Content' if has_content else '⚠️ Empty'}")
                     if has_content:
-                        html_length = len(html_code)
-                        word_count = len(html_code.split())
+                        html_length = metrics.at[idx, 'Char_Count']
+                        word_count = metrics.at[idx, 'Word_Count']
                         st.markdown(f"**Length:** {html_length:,} characters, ~{word_count:,} words")
                 
                 with col2:
@@ -318,7 +291,9 @@ else:
                 
                 if has_content:
                     with st.expander("📄 View HTML Source", expanded=False):
-                        st.code(html_code[:1000] + ("..." if len(html_code) > 1000 else ""), language='html')
+                        # Same header/footer images as the preview and exports
+                        source = render_email_html(html_code, header_img, footer_img)
+                        st.code(source[:1000] + ("..." if len(source) > 1000 else ""), language='html')
     
     with tab2:
         st.markdown("## 👁️ Email Preview")
@@ -337,11 +312,11 @@ else:
             "Select email to preview:",
             email_numbers,
             index=default_index,
-            format_func=lambda x: f"Email #{x}: {df[df['Email_Number']==x]['Title'].iloc[0]}"
+            format_func=lambda x: f"Email #{x}: {email_store.title(x)}"
         )
         
         # Get selected email data
-        selected_row = df[df['Email_Number'] == selected_email_num].iloc[0]
+        selected_row = email_store.get(selected_email_num)
         email_title = str(selected_row['Title'])
         email_subject = str(selected_row['Subject_Line'])
         email_html = str(selected_row['Complete_HTML_Code']).strip()
@@ -355,12 +330,12 @@ else:
             
             with preview_tab1:
                 st.markdown("#### Email Preview (as recipients will see it)")
-                rendered_html = replace_header_footer_images(email_html, header_img, footer_img)
+                rendered_html = render_email_html(email_html, header_img, footer_img)
                 components.html(rendered_html, height=1400, scrolling=True)
             
             with preview_tab2:
                 st.markdown("#### HTML Source Code")
-                display_html = replace_header_footer_images(email_html, header_img, footer_img)
+                display_html = render_email_html(email_html, header_img, footer_img)
                 st.code(display_html, language='html')
                 
                 # Download button
@@ -378,7 +353,7 @@ else:
         st.markdown("## 📊 Analytics Dashboard")
         
         total_emails = len(df)
-        emails_with_content = len(df[df['Complete_HTML_Code'].notna() & (df['Complete_HTML_Code'] != '')])
+        emails_with_content = int(metrics['Has_Content'].sum())
         emails_empty = total_emails - emails_with_content
         completion_rate = (emails_with_content / total_emails * 100) if total_emails > 0 else 0
         
@@ -398,25 +373,17 @@ else:
         # Content statistics
         st.markdown("### 📝 Content Statistics")
         
-        content_stats = []
-        for idx, row in df.iterrows():
-            html_code = str(row['Complete_HTML_Code']).strip()
-            if html_code and html_code != 'nan':
-                char_count = len(html_code)
-                word_count = len(html_code.split())
-                # Estimate reading time (200 words per minute)
-                reading_time = word_count / 200
-                
-                content_stats.append({
-                    'Email': int(row['Email_Number']),
-                    'Title': str(row['Title']),
-                    'Characters': char_count,
-                    'Words': word_count,
-                    'Reading Time (min)': round(reading_time, 1)
-                })
-        
-        if content_stats:
-            stats_df = pd.DataFrame(content_stats)
+        stats_df = metrics.loc[
+            metrics['Has_Content'],
+            ['Email_Number', 'Title', 'Char_Count', 'Word_Count', 'Reading_Time']
+        ].rename(columns={
+            'Email_Number': 'Email',
+            'Char_Count': 'Characters',
+            'Word_Count': 'Words',
+            'Reading_Time': 'Reading Time (min)'
+        })
+        
+        if len(stats_df) > 0:
             
             col1, col2 = st.columns(2)
             with col1:
@@ -448,18 +415,14 @@ else:
         st.markdown("### ✅ Validation Check")
         
         validation_issues = []
-        for idx, row in df.iterrows():
-            email_num = int(row['Email_Number'])
-            subject = str(row['Subject_Line'])
-            html_code = str(row['Complete_HTML_Code']).strip()
-            
+        for email_num, subject_length, has_content in metrics[['Email_Number', 'Subject_Length', 'Has_Content']].itertuples(index=False):
             # Check for issues
-            if not subject or subject == 'nan':
+            if subject_length == 0:
                 validation_issues.append(f"Email #{email_num}: Missing subject line")
-            elif len(subject) > 100:
-                validation_issues.append(f"Email #{email_num}: Subject line too long ({len(subject)} chars)")
+            elif subject_length > 100:
+                validation_issues.append(f"Email #{email_num}: Subject line too long ({subject_length} chars)")
             
-            if not html_code or html_code == 'nan':
+            if not has_content:
                 validation_issues.append(f"Email #{email_num}: Missing HTML content")
         
         if validation_issues:
@@ -480,7 +443,10 @@ else:
             st.markdown("#### Export Options")
             
             if st.button("📥 Export All as CSV Summary", use_container_width=True):
-                csv_data = df.to_csv(index=False).encode('utf-8')
+                export_csv_df = df.assign(Complete_HTML_Code=[
+                    render_email_html(html, header_img, footer_img) for html in df['Complete_HTML_Code']
+                ])
+                csv_data = export_csv_df.to_csv(index=False).encode('utf-8')
                 st.download_button(
                     label="Download CSV",
                     data=csv_data,
@@ -508,7 +474,7 @@ else:
                     email_num = int(row['Email_Number'])
                     title = str(row['Title'])
                     subject = str(row['Subject_Line'])
-                    has_content = bool(str(row['Complete_HTML_Code']).strip() and str(row['Complete_HTML_Code']).strip() != 'nan')
+                    has_content = metrics.at[idx, 'Has_Content']
                     report += f"\n{email_num}. {title}\n   Subject: {subject}\n   Status: {'✅ Complete' if has_content else '⚠️ Empty'}\n"
                 
                 st.download_button(
@@ -566,33 +532,58 @@ else:
                 help="Default is 7 days (weekly)"
             )
         
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            business_days = st.checkbox(
+                "Business days only",
+                value=False,
+                help="Count the days between emails as working days (Mon-Fri)"
+            )
+        
+        with col2:
+            blackout_text = st.text_area(
+                "Blackout dates:",
+                placeholder="2025-12-25, 2026-01-01",
+                help="No email is sent on these dates; sends move to the next free day",
+                height=68
+            )
+        
         if st.button("📅 Calculate Schedule", type="primary", use_container_width=True):
-            schedule_data = []
+            blackout_dates, invalid_dates = parse_dates(blackout_text)
+            if invalid_dates:
+                st.warning(f"⚠️ Ignored invalid dates: {', '.join(invalid_dates)}")
             
-            for idx, row in df.iterrows():
-                email_num = int(row['Email_Number'])
-                title = str(row['Title'])
-                subject = str(row['Subject_Line'])
-                
-                # Calculate send date
-                days_offset = (email_num - 1) * interval_days
-                send_date = start_date + timedelta(days=days_offset)
-                
-                schedule_data.append({
-                    'Email #': email_num,
-                    'Title': title,
-                    'Subject': subject,
-                    'Send Date': send_date.strftime('%Y-%m-%d'),
-                    'Day of Week': send_date.strftime('%A'),
-                    'Days from Start': days_offset
+            # All send dates in one vectorized pass
+            schedule = schedule_sends(
+                (df['Email_Number'].astype(int) - 1) * interval_days,
+                [start_date],
+                business_days=business_days,
+                blackout_dates=blackout_dates,
+                labels=pd.DataFrame({
+                    'Email #': df['Email_Number'].astype(int).to_numpy(),
+                    'Title': df['Title'].astype(str).to_numpy(),
+                    'Subject': df['Subject_Line'].astype(str).to_numpy()
                 })
+            )
             
-            schedule_df = pd.DataFrame(schedule_data)
+            schedule_df = pd.DataFrame({
+                'Email #': schedule['Email #'],
+                'Title': schedule['Title'],
+                'Subject': schedule['Subject'],
+                'Send Date': schedule['Send_Date'].dt.strftime('%Y-%m-%d'),
+                'Day of Week': schedule['Day_Of_Week'],
+                'Days from Start': schedule['Days_From_Start']
+            })
             
             st.markdown("---")
             st.markdown("### 📅 Email Schedule")
             st.dataframe(schedule_df, use_container_width=True, hide_index=True)
             
+            shifted = int(schedule['Shifted'].sum())
+            if shifted:
+                st.caption(f"📆 {shifted} send(s) moved by blackout dates")
+            
             # Download schedule
             csv_schedule = schedule_df.to_csv(index=False).encode('utf-8')
             st.download_button(
@@ -604,7 +595,7 @@ else:
             )
             
             # Summary
-            end_date = start_date + timedelta(days=(len(df) - 1) * interval_days)
+            end_date = schedule['Send_Date'].max().date() if len(schedule) else start_date
             total_days = (end_date - start_date).days
             
             st.markdown("---")
@@ -618,6 +609,60 @@ else:
                 st.metric("Total Duration", f"{total_days} days")
             
             log_activity("Schedule", f"Calculated schedule starting {start_date}")
+        
+        st.markdown("---")
+        st.markdown("### 📈 Send Volume Forecast")
+        st.markdown("Project daily send volume when new subscribers start the sequence every day.")
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            signups_from = st.date_input("Signups from:", value=start_date, key="forecast_from")
+        with col2:
+            signups_until = st.date_input("Signups until:", value=start_date + timedelta(days=90), key="forecast_until")
+        with col3:
+            daily_signups = st.number_input("New subscribers per day:", min_value=0, value=50, step=10)
+        with col4:
+            send_limit = st.number_input("ESP daily send limit:", min_value=0, value=0, step=100,
+                                         help="0 = no limit")
+        
+        if st.button("📈 Forecast Send Volume", use_container_width=True):
+            if signups_until < signups_from:
+                st.error("❌ The signup range ends before it starts")
+            else:
+                blackout_dates, _ = parse_dates(blackout_text)
+                forecast = project_volume(
+                    signup_distribution(signups_from, signups_until, daily_signups),
+                    (df['Email_Number'].astype(int) - 1) * interval_days,
+                    business_days=business_days,
+                    blackout_dates=blackout_dates
+                )
+                
+                st.line_chart(forecast['Sends'])
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Peak Day", forecast['Sends'].idxmax().strftime('%Y-%m-%d'))
+                with col2:
+                    st.metric("Peak Sends", f"{int(forecast['Sends'].max()):,}")
+                with col3:
+                    st.metric("Total Sends", f"{int(forecast['Sends'].sum()):,}")
+                
+                if send_limit:
+                    over_limit = forecast[forecast['Sends'] > send_limit]
+                    if len(over_limit):
+                        st.warning(f"⚠️ {len(over_limit)} day(s) exceed the limit of {send_limit:,} sends, "
+                                   f"first on {over_limit.index[0].strftime('%Y-%m-%d')}")
+                    else:
+                        st.success(f"✅ Every day stays within {send_limit:,} sends")
+                
+                st.download_button(
+                    label="📥 Download Forecast as CSV",
+                    data=forecast.to_csv(date_format='%Y-%m-%d').encode('utf-8'),
+                    file_name=f"videmi_send_forecast_{signups_from}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+                log_activity("Schedule", f"Forecast send volume for signups {signups_from} to {signups_until}")
     
     with tab6:
         st.markdown("## 📦 JSON Export")
@@ -645,163 +690,61 @@ else:
         # Generate JSON button
         if st.button("🔄 Generate JSON", type="primary", use_container_width=True):
             try:
-                # Determine how many emails to export
-                if export_count == "All":
-                    export_df = df.copy()
-                else:
-                    export_df = df.head(export_count)
-                
-                emails_list = []
-                
-                for idx, row in export_df.iterrows():
-                    email_num = int(row['Email_Number'])
-                    title = str(row['Title'])
-                    subject = str(row['Subject_Line'])
-                    html_code = str(row['Complete_HTML_Code']).strip()
-                    
-                    # Calculate delay in seconds (weekly sequence: 0, 604800, 1209600, etc.)
-                    # 604800 seconds = 7 days
-                    delay_seconds = (email_num - 1) * 604800
-                    
-                    # Determine status
-                    status = "published" if (html_code and html_code != 'nan') else "draft"
-                    
-                    # Create slug from title
-                    slug = title.lower().replace(' ', '-').replace('!', '').replace('?', '').replace(':', '')
-                    
-                    # Current timestamp
-                    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    email_obj = {
-                        "id": email_num + 16,  # Start from 17 like the example
-                        "parent_id": "1",
-                        "type": "sequence_mail",
-                        "title": title,
-                        "available_urls": None,
-                        "slug": slug,
-                        "status": status,
-                        "template_id": "0",
-                        "email_subject": subject,
-                        "email_pre_header": "",
-                        "email_body": html_code if (html_code and html_code != 'nan') else "",
-                        "recipients_count": "0",
-                        "delay": str(delay_seconds),
-                        "utm_status": "0",
-                        "utm_source": None,
-                        "utm_medium": None,
-                        "utm_campaign": None,
-                        "utm_term": None,
-                        "utm_content": None,
-                        "design_template": "raw_html",
-                        "scheduled_at": None,
-                        "settings": {
-                            "action_triggers": [],
-                            "timings": {
-                                "delay_unit": "minutes",
-                                "delay": 10,
-                                "is_anytime": "yes",
-                                "sending_time": ""
-                            },
-                            "template_config": [],
-                            "mailer_settings": {
-                                "from_name": "",
-                                "from_email": "",
-                                "reply_to_name": "",
-                                "reply_to_email": "",
-                                "is_custom": "no"
-                            }
-                        },
-                        "created_by": "1",
-                        "created_at": current_time,
-                        "updated_at": current_time
-                    }
-                    
-                    emails_list.append(email_obj)
-                
-                # Create final JSON structure with sequence wrapper
-                json_data = {
-                    "sequence": {
-                        "id": 1,
-                        "parent_id": None,
-                        "type": "email_sequence",
-                        "title": "Welcome",
-                        "available_urls": None,
-                        "slug": "welcome",
-                        "status": "draft",
-                        "template_id": None,
-                        "email_subject": None,
-                        "email_pre_header": None,
-                        "email_body": "",
-                        "recipients_count": 0,
-                        "delay": "0",
-                        "utm_status": "0",
-                        "utm_source": None,
-                        "utm_medium": None,
-                        "utm_campaign": None,
-                        "utm_term": None,
-                        "utm_content": None,
-                        "design_template": "simple",
-                        "scheduled_at": None,
-                        "settings": {
-                            "mailer_settings": {
-                                "from_name": "",
-                                "from_email": "",
-                                "reply_to_name": "",
-                                "reply_to_email": "",
-                                "is_custom": "no"
-                            }
-                        },
-                        "created_by": "1",
-                        "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        "updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    },
-                    "emails": emails_list
-                }
-                
-                # Format JSON
-                if json_format == "Pretty (Readable)":
-                    json_string = json.dumps(json_data, indent=2, ensure_ascii=False)
-                else:
-                    json_string = json.dumps(json_data, ensure_ascii=False)
+                # Streamed once per content version and options
+                json_key, artifact = sequence_json_export(
+                    df, email_store.version, header_img, footer_img,
+                    limit=None if export_count == "All" else export_count,
+                    pretty=json_format == "Pretty (Readable)"
+                )
                 
-                # Store in session state
-                st.session_state.generated_json = json_string
-                st.session_state.json_email_count = len(emails_list)
+                # Only the cache key is kept per session
+                st.session_state.generated_json_key = json_key
                 
-                st.success(f"✅ Successfully generated JSON with {len(emails_list)} emails!")
-                log_activity("JSON Export", f"Generated JSON with {len(emails_list)} emails")
+                st.success(f"✅ Successfully generated JSON with {artifact['emails']} emails!")
+                log_activity("JSON Export", f"Generated JSON with {artifact['emails']} emails")
                 
             except Exception as e:
                 st.error(f"❌ Error generating JSON: {str(e)}")
                 log_activity("Error", f"JSON generation failed: {str(e)}")
         
         # Display and download JSON
-        if 'generated_json' in st.session_state:
+        generated = None
+        if 'generated_json_key' in st.session_state:
+            generated = ARTIFACT_CACHE.get(st.session_state.generated_json_key)
+            if generated is None:
+                st.info("ℹ️ The generated JSON has expired. Click Generate JSON again.")
+                del st.session_state.generated_json_key
+        
+        if generated is not None:
             st.markdown("---")
             st.markdown("### 📄 Generated JSON")
             
+            # Shared cached bytes; the export time is filled in for this download
+            data = stamp_export(generated['data'])
+            
             # Stats
-            json_size = len(st.session_state.generated_json)
-            email_count = st.session_state.json_email_count
+            json_size = len(data)
+            email_count = generated['emails']
             
             stat_col1, stat_col2, stat_col3 = st.columns(3)
             with stat_col1:
                 st.metric("Emails", email_count)
             with stat_col2:
-                st.metric("Size", f"{json_size:,} chars")
+                st.metric("Size", f"{json_size:,} bytes")
             with stat_col3:
                 st.metric("Format", json_format.split()[0])
             
             # Preview
             with st.expander("👁️ Preview JSON", expanded=False):
-                st.code(st.session_state.generated_json[:2000] + ("..." if json_size > 2000 else ""), language='json')
+                preview = data[:2000].decode('utf-8', errors='ignore')
+                st.code(preview + ("..." if json_size > 2000 else ""), language='json')
                 if json_size > 2000:
-                    st.caption(f"Showing first 2,000 of {json_size:,} characters")
+                    st.caption(f"Showing first 2,000 of {json_size:,} bytes")
             
             # Download button
             st.download_button(
                 label="📥 Download JSON File",
-                data=st.session_state.generated_json.encode('utf-8'),
+                data=data,
                 file_name=f"videmi_email_sequence_{email_count}_emails.json",
                 mime="application/json",
                 type="primary",
@@ -0,0 +1,102 @@
+"""Content-addressed caching for values derived from email bodies.
+
+Anything computed from an email's HTML (metrics, analysis, validation) only
+depends on the HTML itself, so it is cached under a hash of the content. An
+edit changes the hash of that one email; every other email keeps hitting the
+cache.
+
+Process-wide caches are created through ``shared`` / ``shared_cache`` and
+listed in ``REGISTRY``. Streamlit runs every browser session in one process
+and keeps imported modules alive between reruns, so whatever is registered
+here is shared by all sessions; never keep per-user state in it.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_hash(content) -> str:
+    """Stable hash of an email body (or any text)"""
+    text = '' if content is None else str(content)
+    return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class ContentCache:
+    """Bounded LRU mapping content hashes to derived values.
+
+    With ``max_bytes`` set, ``sizer(value)`` gives each value's size and the
+    total is kept under that limit as well (the newest entry always stays).
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = None, sizer=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizer = sizer if sizer is not None else len
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Cached value for a content hash (counts as a hit or miss)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return self._entries[key]
+            self.stats['misses'] += 1
+            return default
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries over the limit"""
+        size = self.sizer(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self.total_bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self.max_entries
+                    or (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                evicted, _ = self._entries.popitem(last=False)
+                self.total_bytes -= self._sizes.pop(evicted)
+                self.stats['evictions'] += 1
+
+    def get_or_compute(self, content, compute):
+        """Return ``compute(content)``, reusing the cached result for identical content"""
+        key = content_hash(content)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute(content)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+
+# Every process-wide cache by name
+REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def shared(name: str, factory):
+    """The process-wide object registered as ``name``, created with ``factory()`` on first use"""
+    with _REGISTRY_LOCK:
+        if name not in REGISTRY:
+            REGISTRY[name] = factory()
+        return REGISTRY[name]
+
+
+def shared_cache(name: str, **options) -> ContentCache:
+    """The process-wide ``ContentCache`` registered as ``name`` (options apply on creation)"""
+    return shared(name, lambda: ContentCache(**options))
@@ -6,6 +6,8 @@ import re
 from datetime import datetime, timedelta
 import gspread
 from google.oauth2.service_account import Credentials
+from sheets_loader import open_worksheet, load_email_frame
+from sheets_cache import SHEET_CACHE
 
 # Page configuration
 st.set_page_config(
@@ -177,39 +179,17 @@ with st.sidebar:
                     # Connect to Google Sheets
                     client = gspread.authorize(creds)
                     
-                    # Open spreadsheet
-                    spreadsheet = client.open_by_key(spreadsheet_id)
-                    
-                    # Get worksheet by ID
-                    worksheet = None
-                    for sheet in spreadsheet.worksheets():
-                        if str(sheet.id) == sheet_id:
-                            worksheet = sheet
-                            break
-                    
-                    if not worksheet:
-                        worksheet = spreadsheet.get_worksheet(0)
-                    
-                    # Get all values (to avoid truncation)
-                    all_values = worksheet.get_all_values()
+                    # Shared cache: only re-pulls when the sheet's revision changed
+                    df = SHEET_CACHE.get(
+                        client, spreadsheet_id, sheet_id,
+                        lambda: load_email_frame(open_worksheet(client, spreadsheet_id, sheet_id))
+                    )
                     
-                    if len(all_values) < 2:
+                    if len(df) == 0:
                         st.error("❌ Sheet is empty or has no data rows!")
                     else:
-                        # First row is headers
-                        headers = all_values[0]
-                        data_rows = all_values[1:]
-                        
-                        # Create dataframe
-                        df = pd.DataFrame(data_rows, columns=headers)
-                        
-                        # Convert Email_Number to int
-                        df['Email_Number'] = pd.to_numeric(df['Email_Number'], errors='coerce')
-                        df = df.dropna(subset=['Email_Number'])
-                        df['Email_Number'] = df['Email_Number'].astype(int)
-                        
-                        # Sort by email number
-                        df = df.sort_values('Email_Number')
+                        # The cached frame is shared across sessions, never modify it in place
+                        df = df.copy()
                         
                         if 'Complete_HTML_Code' in df.columns:
                             df['Complete_HTML_Code'] = df['Complete_HTML_Code'].apply(
@@ -0,0 +1,211 @@
+"""Per-email metrics computed once when the newsletter data is loaded.
+
+Every tab used to re-run ``astype(str).str.strip()``, ``split()`` and tag
+counts over all HTML on each Streamlit rerun. ``compute_metrics`` does that
+work a single time and returns a compact table (one row per email, aligned
+with the frame index) that the tabs read from instead.
+
+The HTML-derived columns are cached by content hash, so reloading the sheet
+after a single edit only recomputes the email that changed.
+"""
+from collections import Counter
+
+import pandas as pd
+
+from content_cache import ContentCache, content_hash, shared_cache
+from html_tools import WORDS_PER_MINUTE, extract_content
+from validation import structure_error, validate_documents
+
+METRIC_COLUMNS = [
+    'Email_Number', 'Title', 'Has_Content', 'Status', 'Char_Count', 'Word_Count',
+    'Line_Count', 'Tag_Count', 'Div_Count', 'P_Count', 'Link_Count', 'Image_Count',
+    'Reading_Time', 'Subject_Length', 'HTML_Issues', 'HTML_Valid', 'Structure_Error'
+]
+
+# Columns that only depend on the email body
+HTML_METRIC_COLUMNS = [
+    'Has_Content', 'Char_Count', 'Word_Count', 'Line_Count', 'Tag_Count', 'Div_Count',
+    'P_Count', 'Link_Count', 'Image_Count', 'HTML_Issues', 'Structure_Error'
+]
+
+# HTML metric rows by email body hash
+HTML_METRICS_CACHE = shared_cache('html-metrics')
+
+# analyze_email_content results of the sequence builder, by email body hash
+ANALYSIS_CACHE = shared_cache('email-analysis', max_entries=512)
+
+# Word counts of bodies being previewed or edited, by email body hash
+WORD_COUNT_CACHE = shared_cache('word-counts', max_entries=256)
+
+
+def html_metrics(html) -> pd.DataFrame:
+    """HTML-derived metric columns for a Series of email bodies"""
+    stripped = html.str.strip()
+    has_content = (stripped != '') & (stripped != 'nan')
+    # Words, links and images come from the visible content, not the raw markup
+    content = [extract_content(code) if filled else None
+               for code, filled in zip(html.tolist(), has_content.tolist())]
+
+    metrics = pd.DataFrame({
+        'Has_Content': has_content,
+        'Char_Count': html.str.len(),
+        'Word_Count': [c['word_count'] if c else 0 for c in content],
+        'Line_Count': html.str.count('\n') + 1,
+        'Tag_Count': html.str.count('<'),
+        'Div_Count': html.str.count('<div'),
+        'P_Count': html.str.count('<p'),
+        'Link_Count': [len(c['links']) if c else 0 for c in content],
+        'Image_Count': [len(c['images']) if c else 0 for c in content],
+    }, index=html.index)
+
+    # Structural validation only makes sense for emails that have content
+    filled = [code for code, has in zip(html.tolist(), has_content.tolist()) if has]
+    findings = iter(validate_documents(filled))
+    found = [next(findings) if has else [] for has in has_content.tolist()]
+    metrics['HTML_Issues'] = [len(results) for results in found]
+    # First tag nesting error, for pointing editors at the exact line
+    metrics['Structure_Error'] = [structure_error(results) for results in found]
+    return metrics[HTML_METRIC_COLUMNS]
+
+
+def word_count(html_code) -> int:
+    """Visible words of one body, from the metrics cache when the body was loaded"""
+    key = content_hash(html_code)
+    missing = object()
+    row = HTML_METRICS_CACHE.get(key, missing)
+    if row is not missing:
+        return int(row[HTML_METRIC_COLUMNS.index('Word_Count')])
+    count = WORD_COUNT_CACHE.get(key, missing)
+    if count is missing:
+        count = extract_content(html_code)['word_count']
+        WORD_COUNT_CACHE.put(key, count)
+    return count
+
+
+def body_structure_error(html_code) -> str:
+    """Tag nesting error of one body ('' if none), from the metrics cache when the body was loaded"""
+    missing = object()
+    row = HTML_METRICS_CACHE.get(content_hash(html_code), missing)
+    if row is not missing:
+        return row[HTML_METRIC_COLUMNS.index('Structure_Error')]
+    if not str(html_code).strip():
+        return ''
+    # Findings are cached per body by the validation engine
+    return structure_error(validate_documents([html_code])[0])
+
+
+def compute_metrics(frame, cache: ContentCache = HTML_METRICS_CACHE) -> pd.DataFrame:
+    """Compute the metrics table for a newsletter frame"""
+    html = frame['Complete_HTML_Code'].astype(str)
+    hashes = [content_hash(code) for code in html.tolist()]
+
+    # Only bodies that were never seen before are analysed. Each row is read
+    # once: a separate membership test could be undone by another session's
+    # eviction before the read
+    absent = object()
+    rows = [cache.get(key, absent) for key in hashes]
+    missing = [i for i, row in enumerate(rows) if row is absent]
+    if missing:
+        computed = html_metrics(html.iloc[missing])
+        for i, row in zip(missing, computed.itertuples(index=False)):
+            rows[i] = tuple(row)
+            cache.put(hashes[i], rows[i])
+
+    metrics = pd.DataFrame(rows, columns=HTML_METRIC_COLUMNS, index=frame.index)
+    metrics = metrics.astype({'Has_Content': bool})
+
+    metrics['Email_Number'] = frame['Email_Number']
+    metrics['Title'] = frame['Title'].astype(str)
+    metrics['Status'] = metrics['Has_Content'].map({True: 'Completed', False: 'Pending'})
+    metrics['Reading_Time'] = (metrics['Word_Count'] / WORDS_PER_MINUTE).round(1)
+    metrics['Subject_Length'] = frame['Subject_Line'].astype(str).str.len()
+    metrics['HTML_Valid'] = metrics['HTML_Issues'] == 0
+    return metrics[METRIC_COLUMNS]
+
+
+def summarize_metrics(metrics, target: int = 52) -> dict:
+    """Campaign-level statistics derived from the metrics table"""
+    if metrics is None or len(metrics) == 0:
+        return {
+            'total': 0,
+            'completed': 0,
+            'pending': 0,
+            'draft': 0,
+            'progress': 0,
+            'avg_html_length': 0,
+            'completion_rate': 0,
+            'total_chars': 0,
+            'max_chars': 0,
+            'min_chars': 0,
+            'invalid_html': 0
+        }
+
+    completed_rows = metrics[metrics['Has_Content']]
+    total = len(metrics)
+    completed = len(completed_rows)
+
+    return {
+        'total': total,
+        'completed': completed,
+        'pending': total - completed,
+        'draft': 0,  # Can be enhanced later
+        'progress': (completed / target * 100) if total > 0 else 0,
+        'avg_html_length': int(completed_rows['Char_Count'].mean()) if completed > 0 else 0,
+        'completion_rate': (completed / total * 100) if total > 0 else 0,
+        'total_chars': int(metrics['Char_Count'].sum()),
+        'max_chars': int(metrics['Char_Count'].max()),
+        'min_chars': int(completed_rows['Char_Count'].min()) if completed > 0 else 0,
+        'invalid_html': int((~completed_rows['HTML_Valid']).sum())
+    }
+
+
+class SequenceMetrics:
+    """Per-email stats for an editable sequence with incrementally updated totals.
+
+    Stats are keyed by the content hash of each body. ``sync`` diffs the
+    current bodies against the previous call: only new bodies are analysed,
+    and the numeric totals are adjusted by the stats of the bodies that were
+    added or removed instead of being summed over the whole sequence again.
+    """
+
+    def __init__(self, analyze):
+        self.analyze = analyze
+        self._stats = {}
+        self._counts = Counter()
+        self.totals = Counter()
+        self.analyzed = 0
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def _apply(self, key, count: int, sign: int):
+        for name, value in self._stats[key].items():
+            if isinstance(value, (int, float)):
+                self.totals[name] += sign * count * value
+
+    def sync(self, contents) -> list:
+        """Track the given bodies and return their stats in the same order"""
+        hashes = [content_hash(content) for content in contents]
+        counts = Counter(hashes)
+        first = {}
+        for position, key in enumerate(hashes):
+            first.setdefault(key, position)
+
+        for key, count in (self._counts - counts).items():
+            self._apply(key, count, -1)
+        for key, count in (counts - self._counts).items():
+            if key not in self._stats:
+                self._stats[key] = self.analyze(contents[first[key]])
+                self.analyzed += 1
+            self._apply(key, count, 1)
+
+        # Forget bodies that are no longer part of the sequence
+        for key in [key for key in self._stats if key not in counts]:
+            del self._stats[key]
+        self._counts = counts
+        return [self._stats[key] for key in hashes]
+
+    def average(self, name: str) -> float:
+        """Mean of a numeric stat over the tracked emails"""
+        count = len(self)
+        return self.totals[name] / count if count else 0
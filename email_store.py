@@ -0,0 +1,108 @@
+"""Indexed access to the newsletter frame by week number.
+
+The store is built once when the sheet is loaded and replaced whenever the
+data is reloaded (after writes), so every tab can look up a week in O(1)
+instead of filtering the whole frame. The per-email metrics table is computed
+alongside it, once per load. Searches go through the sheet's shared full-text
+index, which is synced with the store's frame on first search, so a reload
+only re-indexes the emails that changed.
+"""
+import threading
+
+from email_metrics import compute_metrics
+from exports import frame_version
+from search_index import SearchIndex, shared_index
+
+
+class EmailStore:
+    """Week-number index over a loaded newsletter DataFrame.
+
+    ``source`` identifies the sheet the frame came from; stores of the same
+    sheet share one search index. Without it the store indexes on its own.
+    """
+
+    def __init__(self, frame, source=None):
+        self.frame = frame
+        self.source = source
+        self.metrics = compute_metrics(frame)
+        self._search_index = None
+        self._search_lock = threading.Lock()
+        self._version = None
+        weeks = frame['Email_Number'].tolist()
+        titles = frame['Title'].tolist()
+
+        # Position of the first row for each week (matches the old .iloc[0] lookups)
+        self._positions = {}
+        self._titles = {}
+        for position, (week, title) in enumerate(zip(weeks, titles)):
+            week = int(week)
+            if week not in self._positions:
+                self._positions[week] = position
+                self._titles[week] = title
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _position(self, week):
+        try:
+            return self._positions.get(int(week))
+        except (TypeError, ValueError):
+            return None
+
+    def exists(self, week) -> bool:
+        """Whether a newsletter exists for this week"""
+        return self._position(week) is not None
+
+    def get(self, week):
+        """Row of the newsletter for this week, or None"""
+        position = self._position(week)
+        if position is None:
+            return None
+        return self.frame.iloc[position]
+
+    def sheet_row(self, week):
+        """Google Sheets row number of this week's newsletter, or None"""
+        position = self._position(week)
+        if position is None:
+            return None
+        return int(self.frame.index[position]) + 2
+
+    def title(self, week) -> str:
+        """Title of this week's newsletter ('' if missing)"""
+        position = self._position(week)
+        return self._titles[int(week)] if position is not None else ''
+
+    def _index(self) -> SearchIndex:
+        if self.source is not None:
+            return shared_index(self.source)
+        with self._search_lock:
+            if self._search_index is None:
+                self._search_index = SearchIndex()
+            return self._search_index
+
+    def _query(self, method: str, *args):
+        index = self._index()
+        # Held while querying: another session may sync the index to its own frame
+        with index.lock:
+            if index.version != self.version:
+                index.sync(self.frame, self.version)
+            return getattr(index, method)(*args)
+
+    def search(self, query: str):
+        """Row labels of the emails matching every part of the query (None for an empty query)"""
+        return self._query('search', query)
+
+    def rank(self, query: str, limit: int = None) -> list:
+        """Matching emails, best first, with score and snippet (see ``SearchIndex.rank``)"""
+        return self._query('rank', query, limit)
+
+    @property
+    def version(self) -> str:
+        """Content hash of the loaded data, computed on first use"""
+        if self._version is None:
+            self._version = frame_version(self.frame)
+        return self._version
+
+    def weeks(self) -> list:
+        """Week numbers in frame order"""
+        return list(self._positions)
@@ -0,0 +1,308 @@
+"""Export builders for the newsletter apps.
+
+Archives are written one email at a time, so no rendered copy of the whole
+corpus is built next to the archive. The finished archive is returned as
+bytes: ``st.download_button`` needs bytes (or a BytesIO) and holds the whole
+payload in memory anyway, so spooling it to disk would save nothing.
+
+The automation JSON is streamed the same way: the ``sequence`` wrapper and
+each email object are encoded one at a time instead of building the full
+structure and dumping it in one go.
+
+Serialized exports (JSON, CSV, backups) are kept in a process-wide artifact
+cache keyed by the version of the data plus the export options, so repeated
+clicks, reruns and other sessions exporting the same data reuse the bytes
+instead of serializing again.
+"""
+import csv
+import hashlib
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+
+from content_cache import content_hash, shared_cache
+from html_tools import render_email_html, replace_header_footer_images
+
+MANIFEST_COLUMNS = ['Email_Number', 'Title', 'Subject_Line', 'File', 'Bytes', 'SHA1', 'Status']
+
+# One week between sequence emails
+SEQUENCE_DELAY_SECONDS = 604800
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Stands in for the export time in cached sequence JSON (see stamp_export)
+TIMESTAMP_PLACEHOLDER = '0000-00-00 00:00:00'
+
+# Serialized exports by (kind, data version, options); bounded by total size
+# as well, since an export of a large sheet runs to megabytes
+ARTIFACT_CACHE = shared_cache('export-artifacts', max_entries=32, max_bytes=256 * 1024 * 1024,
+                              sizer=lambda artifact: len(artifact['data']))
+
+
+def slugify(text: str, max_length: int = 50) -> str:
+    """Filesystem-safe slug of a title"""
+    slug = re.sub(r'[^\w]+', '-', str(text).lower()).strip('-')
+    return slug[:max_length].rstrip('-') or 'untitled'
+
+
+def html_file_name(week: int, title: str) -> str:
+    """Archive file name of one week's newsletter"""
+    return f"week_{int(week):02d}_{slugify(title)}.html"
+
+
+def build_html_zip(frame, header_url: str = None, footer_url: str = None):
+    """Write every week's HTML plus a manifest.csv into a ZIP archive.
+
+    Header/footer images are substituted per email when both URLs are given.
+    Returns ``(archive_bytes, manifest_rows)``; the archive is held in memory
+    in full, since that is what the download button needs.
+    """
+    archive = io.BytesIO()
+    manifest = []
+    substitute = bool(header_url and footer_url)
+
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        # Columns are walked side by side; no frame copy is made
+        rows = zip(frame['Email_Number'], frame['Title'], frame['Subject_Line'], frame['Complete_HTML_Code'])
+        used_names = set()
+        for week, title, subject, html_code in rows:
+            html_code = '' if html_code is None else str(html_code)
+            has_content = bool(html_code.strip()) and html_code != 'nan'
+            entry = {
+                'Email_Number': int(week),
+                'Title': title,
+                'Subject_Line': subject,
+                'File': '',
+                'Bytes': 0,
+                'SHA1': '',
+                'Status': 'Completed' if has_content else 'Pending'
+            }
+            if has_content:
+                if substitute:
+                    html_code = replace_header_footer_images(html_code, header_url, footer_url)
+                data = html_code.encode('utf-8')
+                name = html_file_name(week, title)
+                if name in used_names:
+                    name = f"{name[:-5]}_{len(used_names)}.html"
+                used_names.add(name)
+                entry['File'] = name
+                entry['Bytes'] = len(data)
+                entry['SHA1'] = hashlib.sha1(data).hexdigest()
+                with zf.open(entry['File'], 'w') as member:
+                    member.write(data)
+                del data
+            manifest.append(entry)
+
+        with zf.open('manifest.csv', 'w') as member:
+            text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+            writer = csv.DictWriter(text, fieldnames=MANIFEST_COLUMNS)
+            writer.writeheader()
+            writer.writerows(manifest)
+            text.flush()
+            text.detach()
+
+    return archive.getvalue(), manifest
+
+
+def frame_version(frame) -> str:
+    """Hash of the exported columns of a newsletter frame"""
+    digest = hashlib.sha1()
+    rows = zip(frame['Email_Number'], frame['Title'], frame['Subject_Line'], frame['Complete_HTML_Code'])
+    for row in rows:
+        digest.update('\x1f'.join(str(value) for value in row).encode('utf-8', 'surrogatepass'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def artifact_key(kind: str, version: str, **options) -> str:
+    """Cache key of one export of a data version with the given options"""
+    parts = [kind, version] + [f"{name}={options[name]!r}" for name in sorted(options)]
+    return content_hash('\x1f'.join(parts))
+
+
+def export_artifact(kind: str, version: str, build, **options) -> tuple:
+    """Serialized export, built at most once per (kind, data version, options).
+
+    ``build()`` returns the bytes, or ``(bytes, details)`` where ``details``
+    is a dict stored alongside them. Returns ``(key, artifact)``; the artifact
+    is a dict with ``data``, ``created`` and any details, and is shared by
+    every session, so callers keep only the key.
+    """
+    key = artifact_key(kind, version, **options)
+    artifact = ARTIFACT_CACHE.get(key)
+    if artifact is None:
+        built = build()
+        data, details = built if isinstance(built, tuple) else (built, {})
+        artifact = dict(details, data=data, created=datetime.now())
+        ARTIFACT_CACHE.put(key, artifact)
+    return key, artifact
+
+
+def sequence_wrapper(timestamp: str) -> dict:
+    """The ``sequence`` object that wraps the exported emails"""
+    return {
+        "id": 1,
+        "parent_id": None,
+        "type": "email_sequence",
+        "title": "Welcome",
+        "available_urls": None,
+        "slug": "welcome",
+        "status": "draft",
+        "template_id": None,
+        "email_subject": None,
+        "email_pre_header": None,
+        "email_body": "",
+        "recipients_count": 0,
+        "delay": "0",
+        "utm_status": "0",
+        "utm_source": None,
+        "utm_medium": None,
+        "utm_campaign": None,
+        "utm_term": None,
+        "utm_content": None,
+        "design_template": "simple",
+        "scheduled_at": None,
+        "settings": {
+            "mailer_settings": {
+                "from_name": "",
+                "from_email": "",
+                "reply_to_name": "",
+                "reply_to_email": "",
+                "is_custom": "no"
+            }
+        },
+        "created_by": "1",
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+
+
+def sequence_email(week, title, subject, body: str, timestamp: str) -> dict:
+    """One email object of the automation JSON (body already rendered, '' for drafts)"""
+    week = int(week)
+    title = str(title)
+    return {
+        "id": week + 16,  # Start from 17 like the example
+        "parent_id": "1",
+        "type": "sequence_mail",
+        "title": title,
+        "available_urls": None,
+        "slug": title.lower().replace(' ', '-').replace('!', '').replace('?', '').replace(':', ''),
+        "status": "published" if body else "draft",
+        "template_id": "0",
+        "email_subject": str(subject),
+        "email_pre_header": "",
+        "email_body": body,
+        "recipients_count": "0",
+        # Weekly sequence: 0, 604800, 1209600, ...
+        "delay": str((week - 1) * SEQUENCE_DELAY_SECONDS),
+        "utm_status": "0",
+        "utm_source": None,
+        "utm_medium": None,
+        "utm_campaign": None,
+        "utm_term": None,
+        "utm_content": None,
+        "design_template": "raw_html",
+        "scheduled_at": None,
+        "settings": {
+            "action_triggers": [],
+            "timings": {
+                "delay_unit": "minutes",
+                "delay": 10,
+                "is_anytime": "yes",
+                "sending_time": ""
+            },
+            "template_config": [],
+            "mailer_settings": {
+                "from_name": "",
+                "from_email": "",
+                "reply_to_name": "",
+                "reply_to_email": "",
+                "is_custom": "no"
+            }
+        },
+        "created_by": "1",
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+
+
+def stamp_export(data: bytes, timestamp: datetime = None) -> bytes:
+    """Cached sequence JSON with its placeholder timestamps set to the export time"""
+    stamp = (timestamp or datetime.now()).strftime(TIMESTAMP_FORMAT)
+    # Quotes inside email bodies are escaped, so only the real fields match
+    for field in ('created_at', 'updated_at'):
+        data = data.replace(f'"{field}": "{TIMESTAMP_PLACEHOLDER}"'.encode('utf-8'),
+                            f'"{field}": "{stamp}"'.encode('utf-8'))
+    return data
+
+
+def iter_sequence_json(sequence: dict, emails, pretty: bool = True):
+    """Yield the ``{"sequence": ..., "emails": [...]}`` document piece by piece.
+
+    The output is identical to ``json.dumps`` of the whole structure (with
+    ``indent=2`` when pretty), but only one email is encoded at a time.
+    """
+    encoder = json.JSONEncoder(indent=2 if pretty else None, ensure_ascii=False)
+
+    def encode(value, depth):
+        # JSON strings never contain raw newlines, so re-indenting lines is safe
+        text = encoder.encode(value)
+        return text.replace('\n', '\n' + '  ' * depth) if pretty else text
+
+    if not pretty:
+        yield '{"sequence": ' + encode(sequence, 0) + ', "emails": ['
+        for position, email in enumerate(emails):
+            yield (', ' if position else '') + encode(email, 0)
+        yield ']}'
+        return
+
+    yield '{\n  "sequence": ' + encode(sequence, 1) + ',\n  "emails": ['
+    empty = True
+    for email in emails:
+        yield (',\n    ' if not empty else '\n    ') + encode(email, 2)
+        empty = False
+    yield ']\n}' if empty else '\n  ]\n}'
+
+
+def write_sequence_json(frame, header_url: str, footer_url: str, pretty: bool = True,
+                        timestamp: str = None) -> tuple:
+    """Stream the automation JSON of a frame into bytes; returns ``(data, email_count)``"""
+    timestamp = timestamp or datetime.now().strftime(TIMESTAMP_FORMAT)
+    count = 0
+
+    def emails():
+        nonlocal count
+        rows = zip(frame['Email_Number'], frame['Title'], frame['Subject_Line'], frame['Complete_HTML_Code'])
+        for week, title, subject, html_code in rows:
+            html_code = str(html_code).strip()
+            has_content = bool(html_code) and html_code != 'nan'
+            body = render_email_html(html_code, header_url, footer_url) if has_content else ""
+            count += 1
+            yield sequence_email(week, title, subject, body, timestamp)
+
+    buffer = io.BytesIO()
+    for chunk in iter_sequence_json(sequence_wrapper(timestamp), emails(), pretty):
+        buffer.write(chunk.encode('utf-8'))
+    return buffer.getvalue(), count
+
+
+def sequence_json_export(frame, version: str, header_url: str, footer_url: str,
+                         limit: int = None, pretty: bool = True) -> tuple:
+    """Cached automation JSON of the first ``limit`` emails; returns ``(key, artifact)``.
+
+    The cached data carries placeholder timestamps; pass it through
+    ``stamp_export`` when it is handed out.
+    """
+    def build():
+        data, count = write_sequence_json(
+            frame if limit is None else frame.head(limit), header_url, footer_url, pretty,
+            timestamp=TIMESTAMP_PLACEHOLDER
+        )
+        return data, {'emails': count}
+
+    return export_artifact(
+        'sequence-json', version, build,
+        limit=limit, header=header_url, footer=footer_url, pretty=pretty
+    )
@@ -0,0 +1,302 @@
+"""HTML helpers shared by the newsletter apps."""
+import html
+import re
+
+from content_cache import content_hash, shared_cache
+
+
+# Average reading speed used for reading time estimates
+WORDS_PER_MINUTE = 200
+
+# A single left-to-right pass over the markup for the tag checker: comments,
+# raw-text blocks (style/script, skipped whole), doctype, tags, and text.
+_HTML_TOKENS = re.compile(
+    r'<!--.*?(?:-->|$)'
+    r'|<(?P<raw>script|style)\b[^>]*>.*?(?:</(?P=raw)\s*>|$)'
+    r'|<!(?:[^>]*)>'
+    r'|<(?P<close>/)?(?P<tag>[a-zA-Z][\w:-]*)(?P<attrs>[^>]*)>'
+    r'|(?P<text>[^<]+|<)',
+    re.DOTALL | re.IGNORECASE
+)
+# Markup that is never visible: comments, style/script blocks, doctype
+_INVISIBLE = re.compile(
+    r'<!--.*?(?:-->|$)|<(script|style)\b[^>]*>.*?(?:</\1\s*>|$)|<![^>]*>',
+    re.DOTALL | re.IGNORECASE
+)
+# Inline elements join the text around them (``un<b>believ</b>able`` is one
+# word); every other tag (blocks, <br>, images) separates words. Matched
+# case-sensitively, which is several times faster than IGNORECASE; documents
+# with upper-case tag names take the slower case-insensitive pattern.
+_INLINE_ELEMENTS = (
+    'a|abbr|b|bdi|bdo|big|cite|code|del|dfn|em|font|i|ins|kbd|label|mark|q|s|samp'
+    '|small|span|strike|strong|sub|sup|time|tt|u|var'
+)
+_INLINE_TAG = re.compile(r'</?(?:' + _INLINE_ELEMENTS + r')(?=[\s/>])[^>]*>')
+_INLINE_TAG_ANY_CASE = re.compile(r'</?(?:' + _INLINE_ELEMENTS + r')(?=[\s/>])[^>]*>', re.IGNORECASE)
+_UPPER_CASE_TAG = re.compile(r'</?[A-Z]')
+_TAG = re.compile(r'<[^>]*>')
+_ANCHOR = re.compile(r'<a\s([^>]*)>(.*?)(?:</a\s*>|$)', re.DOTALL | re.IGNORECASE)
+_IMAGE = re.compile(r'<img\s([^>]*)>', re.IGNORECASE)
+_HREF = re.compile(r'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+_SRC = re.compile(r'\bsrc\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+_ALT = re.compile(r'\balt\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+
+
+def _attribute(pattern, attrs: str):
+    match = pattern.search(attrs)
+    if match is None:
+        return None
+    return html.unescape(match.group(1) or match.group(2) or match.group(3) or '')
+
+
+def _text(markup: str) -> str:
+    if '<' not in markup:
+        # Most link labels are plain text
+        return html.unescape(markup)
+    inline = _INLINE_TAG_ANY_CASE if _UPPER_CASE_TAG.search(markup) else _INLINE_TAG
+    return html.unescape(_TAG.sub(' ', inline.sub('', markup)))
+
+
+def extract_content(html_content) -> dict:
+    """Visible text, word count and link/image inventory of an email.
+
+    Style and script blocks and comments are dropped, block-level tags and
+    ``<br>`` separate words while inline tags do not, and entities are
+    decoded. Each step is a single regex pass over the document rather than
+    a Python loop per token; together the passes cost roughly 4-6x a bare
+    ``re.sub`` + split (about 10 ms for 52 typical emails). Folding them into
+    one pattern needs case-insensitive tag matching, which measured slower.
+    """
+    markup = _INVISIBLE.sub(' ', '' if html_content is None else str(html_content))
+
+    links = []
+    for attrs, inner in _ANCHOR.findall(markup):
+        href = _attribute(_HREF, attrs)
+        if href is not None:
+            links.append({'href': href, 'text': ' '.join(_text(inner).split())})
+    images = [
+        {'src': _attribute(_SRC, attrs) or '', 'alt': _attribute(_ALT, attrs) or ''}
+        for attrs in _IMAGE.findall(markup)
+    ]
+
+    words = _text(markup).split()
+    return {
+        'text': ' '.join(words),
+        'word_count': len(words),
+        'links': links,
+        'images': images,
+        'reading_time': len(words) / WORDS_PER_MINUTE
+    }
+
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+})
+# Elements whose closing tag HTML allows to be omitted
+OPTIONAL_END_ELEMENTS = frozenset({
+    'p', 'li', 'dt', 'dd', 'option', 'tr', 'td', 'th', 'thead', 'tbody', 'tfoot', 'colgroup'
+})
+
+
+def line_column(text: str, offset: int) -> tuple:
+    """1-based line and column of a character offset"""
+    line_start = text.rfind('\n', 0, offset) + 1
+    return text.count('\n', 0, offset) + 1, offset - line_start + 1
+
+
+def find_tag_mismatch(html_code) -> dict:
+    """First structural tag error of a document, or None when tags nest properly.
+
+    Single pass with a stack of open elements: void elements and self-closing
+    tags never open, style/script/comments are skipped, and elements with an
+    optional end tag are closed implicitly by their parent's closing tag.
+    """
+    html_code = '' if html_code is None else str(html_code)
+    stack = []
+    open_counts = {}
+
+    def error(rule, message, offset, tag):
+        line, column = line_column(html_code, offset)
+        return {
+            'rule': rule,
+            'message': f"{message} at line {line}, column {column}",
+            'tag': tag,
+            'line': line,
+            'column': column
+        }
+
+    for token in _HTML_TOKENS.finditer(html_code):
+        tag = token.group('tag')
+        if tag is None:
+            continue
+        tag = tag.lower()
+
+        if not token.group('close'):
+            if tag not in VOID_ELEMENTS and not token.group('attrs').rstrip().endswith('/'):
+                stack.append((tag, token.start()))
+                open_counts[tag] = open_counts.get(tag, 0) + 1
+            continue
+
+        if tag in VOID_ELEMENTS:
+            continue
+        if open_counts.get(tag):
+            while stack[-1][0] != tag and stack[-1][0] in OPTIONAL_END_ELEMENTS:
+                open_counts[stack.pop()[0]] -= 1
+        if stack and stack[-1][0] == tag:
+            stack.pop()
+            open_counts[tag] -= 1
+        elif open_counts.get(tag):
+            expected, opened_at = stack[-1]
+            line, column = line_column(html_code, opened_at)
+            return error(
+                'tag-mismatch',
+                f"Expected </{expected}> (opened at line {line}, column {column}) before </{tag}>",
+                token.start(), tag
+            )
+        else:
+            return error('unexpected-close', f"Unexpected closing </{tag}>", token.start(), tag)
+
+    for tag, offset in stack:
+        if tag not in OPTIONAL_END_ELEMENTS:
+            return error('unclosed-tag', f"Unclosed <{tag}>", offset, tag)
+    return None
+
+
+def visible_text(html_content) -> str:
+    """Text a reader sees: markup, styles, scripts and comments removed, entities decoded"""
+    if not html_content or html_content == 'nan':
+        return ''
+    return extract_content(html_content)['text']
+
+
+# One pass over the body finds the header/footer image divs, their closing
+# tags and every <img>; the src values to rewrite are picked from that stream.
+_IMAGE_SLOT_TOKENS = re.compile(
+    r'<div\b[^>]*\bclass=["\'](?P<div>header|footer)-image["\'][^>]*>'
+    r'|</div\s*>'
+    r'|<img\b[^>]*>',
+    re.IGNORECASE
+)
+_IMG_SRC = re.compile(r'\ssrc=(["\'])(?P<src>[^"\']*)\1', re.IGNORECASE)
+_IMG_ALT = re.compile(r'\salt=(["\'])(?P<alt>[^"\']*)\1', re.IGNORECASE)
+
+
+class ImageSlots:
+    """An email body split around its header/footer image URLs.
+
+    Built once per body; ``render`` only joins the cached static segments
+    with the requested URLs, so changing a URL never re-scans the HTML.
+    """
+
+    __slots__ = ('segments', 'kinds')
+
+    def __init__(self, segments: tuple, kinds: tuple):
+        self.segments = segments
+        self.kinds = kinds
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def render(self, header_url: str, footer_url: str) -> str:
+        """Body with every header/footer image slot set to the given URLs"""
+        if not self.kinds:
+            return self.segments[0]
+        urls = {'header': header_url, 'footer': footer_url}
+        parts = [self.segments[0]]
+        for kind, segment in zip(self.kinds, self.segments[1:]):
+            parts.append(urls[kind])
+            parts.append(segment)
+        return ''.join(parts)
+
+
+def locate_image_slots(html_content: str, match_alt: bool = False) -> ImageSlots:
+    """Find the header/footer image src values of an email body in a single scan.
+
+    The first <img> inside a ``header-image``/``footer-image`` div is a slot.
+    With ``match_alt`` an <img> whose alt text mentions Header/Footer is one too.
+    """
+    spans = []
+    current = None
+    filled = False
+    for token in _IMAGE_SLOT_TOKENS.finditer(html_content):
+        text = token.group(0)
+        if token.group('div'):
+            current = token.group('div').lower()
+            filled = False
+            continue
+        if text[1] == '/':
+            current = None
+            continue
+
+        src = _IMG_SRC.search(text)
+        if src is None:
+            continue
+        kind = None
+        if current and not filled:
+            kind = current
+            filled = True
+        elif match_alt:
+            alt = _IMG_ALT.search(text)
+            alt_text = alt.group('alt').lower() if alt else ''
+            if 'header' in alt_text:
+                kind = 'header'
+            elif 'footer' in alt_text:
+                kind = 'footer'
+        if kind:
+            offset = token.start()
+            spans.append((offset + src.start('src'), offset + src.end('src'), kind))
+
+    segments = []
+    position = 0
+    for start, end, _ in spans:
+        segments.append(html_content[position:start])
+        position = end
+    segments.append(html_content[position:])
+    return ImageSlots(tuple(segments), tuple(kind for _, _, kind in spans))
+
+
+# Slot offsets per body
+IMAGE_SLOT_CACHE = shared_cache('image-slots')
+
+
+def image_slots(html_content: str, match_alt: bool = False, digest: str = None) -> ImageSlots:
+    """Cached ``locate_image_slots`` keyed by the body's content hash"""
+    key = (digest or content_hash(html_content), match_alt)
+    slots = IMAGE_SLOT_CACHE.get(key)
+    if slots is None:
+        slots = locate_image_slots(html_content, match_alt)
+        IMAGE_SLOT_CACHE.put(key, slots)
+    return slots
+
+
+def replace_header_footer_images(html_content, header_url, footer_url, match_alt: bool = False):
+    """
+    Replace header and footer image URLs in HTML content with specified URLs.
+    Looks for images within header-image and footer-image divs.
+    """
+    if not html_content or html_content == 'nan':
+        return html_content
+    return image_slots(html_content, match_alt).render(header_url, footer_url)
+
+
+# Rendered bodies for the emails actually previewed or exported
+RENDER_CACHE = shared_cache('rendered-emails', max_entries=256)
+
+
+def render_email_html(html_content, header_url, footer_url, match_alt: bool = False):
+    """Email body with the given header/footer images, memoized per (body, header, footer).
+
+    The stored HTML is never rewritten; substitution happens here, lazily, for
+    the one email that is being shown or exported.
+    """
+    if not html_content or html_content == 'nan':
+        return html_content
+    digest = content_hash(html_content)
+    key = (digest, header_url, footer_url, match_alt)
+    rendered = RENDER_CACHE.get(key)
+    if rendered is None:
+        rendered = image_slots(html_content, match_alt, digest).render(header_url, footer_url)
+        RENDER_CACHE.put(key, rendered)
+    return rendered
@@ -0,0 +1,71 @@
+"""Filter, sort and paginate stage for the newsletter library views.
+
+The library used to copy the whole frame, filter and sort it, and then build
+an expander or card for every email on each rerun. ``query_library`` works on
+index labels only, and ``page_controls`` picks the window of rows whose
+widgets are actually rendered.
+"""
+import math
+
+import pandas as pd
+import streamlit as st
+
+PAGE_SIZES = [12, 24, 48, 96]
+
+
+def query_library(frame, metrics, search_mask=None, has_content=None,
+                  sort_by: str = 'Email_Number', ascending: bool = True) -> pd.Index:
+    """Index labels of the rows to show, filtered and sorted without copying the frame"""
+    keep = pd.Series(True, index=frame.index)
+    if search_mask is not None:
+        keep &= search_mask
+    if has_content is not None:
+        keep &= metrics['Has_Content'] if has_content else ~metrics['Has_Content']
+    keys = frame.loc[keep, sort_by]
+    return keys.sort_values(ascending=ascending, kind='stable').index
+
+
+def page_window(total: int, page: int, page_size: int) -> tuple:
+    """(start, end, page count) of a page, with the page clamped into range"""
+    pages = max(1, math.ceil(total / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total), pages
+
+
+def page_controls(total: int, key: str, default_size: int = PAGE_SIZES[0]) -> tuple:
+    """Page size and page pickers; returns the (start, end) slice to render"""
+    if total == 0:
+        return 0, 0
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox(
+            "Per page",
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(default_size) if default_size in PAGE_SIZES else 0,
+            key=f"{key}_page_size"
+        )
+    pages = max(1, math.ceil(total / page_size))
+    page_key = f"{key}_page"
+    # Keep the remembered page valid when filters or the page size shrink the result
+    st.session_state[page_key] = min(max(1, int(st.session_state.get(page_key, 1))), pages)
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+
+    start, end, pages = page_window(total, int(page), page_size)
+    with col3:
+        st.caption(f"Showing {start + 1}-{end} of {total} (page {int(page)} of {pages})")
+    return start, end
+
+
+def show_search_hits(hits: list, label: str = "Week "):
+    """Ranked search matches with the passage that matched"""
+    if not hits:
+        st.info("No matches found")
+        return
+    for hit in hits:
+        st.markdown(
+            f"**{label}{hit['week']} – {hit['title']}** · score {hit['score']}  \n"
+            f"{hit['snippet'] or '_(no body text)_'}"
+        )
@@ -0,0 +1,164 @@
+"""Vectorized send-date scheduling for email sequences.
+
+Send dates are computed for every (start date, email) pair in one shot with
+NumPy ``datetime64`` arithmetic instead of looping over rows and formatting
+each date. Two calendars are supported:
+
+* calendar days: the delay is counted in days, and a send that lands on a
+  blackout date moves to the next free day,
+* business days: the delay is counted in working days (Mon-Fri by default),
+  skipping weekends and blackout dates.
+
+Several start dates (cohorts) are scheduled at once; the result is a typed
+frame with one row per cohort and email.
+
+``project_volume`` turns a signup distribution (subscribers starting the
+sequence per day) into a forecast of sends per day. On a plain calendar this
+is a convolution of the cohort sizes with the histogram of email delays;
+with business days or blackout dates the per-cohort send dates are scattered
+into daily bins instead.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+ALL_WEEK = '1111111'
+BUSINESS_WEEK = '1111100'
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+SCHEDULE_COLUMNS = [
+    'Cohort_Start', 'Email_Index', 'Delay', 'Send_Date', 'Day_Of_Week', 'Days_From_Start', 'Shifted'
+]
+
+
+def to_days(dates) -> np.ndarray:
+    """Dates (strings, date/datetime objects or datetime64) as a ``datetime64[D]`` array"""
+    values = pd.to_datetime(pd.Series(np.atleast_1d(np.asarray(dates, dtype=object)), dtype=object))
+    return values.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+
+
+def parse_dates(text: str) -> tuple:
+    """``(dates, invalid)`` from free text of comma/space/newline separated dates"""
+    tokens = [token for token in re.split(r'[\s,;]+', text or '') if token]
+    # Each token on its own: one call over all of them infers a single format
+    parsed = [pd.to_datetime(token, errors='coerce') for token in tokens]
+    invalid = [token for token, value in zip(tokens, parsed) if pd.isna(value)]
+    valid = [value for value in parsed if not pd.isna(value)]
+    dates = to_days(valid) if valid else np.array([], dtype='datetime64[D]')
+    return dates, invalid
+
+
+def send_dates(delays, start_dates, business_days: bool = False, blackout_dates=None,
+               weekmask: str = BUSINESS_WEEK) -> np.ndarray:
+    """``datetime64[D]`` matrix of send dates, one row per start date and one column per delay"""
+    delays = np.asarray(delays, dtype='int64')
+    starts = to_days(start_dates)
+    holidays = (np.array([], dtype='datetime64[D]') if blackout_dates is None or len(blackout_dates) == 0
+                else to_days(blackout_dates))
+
+    if business_days:
+        first = np.busday_offset(starts, 0, roll='forward', weekmask=weekmask, holidays=holidays)
+        return np.busday_offset(first[:, None], delays[None, :], roll='forward',
+                                weekmask=weekmask, holidays=holidays)
+
+    naive = starts[:, None] + delays[None, :].astype('timedelta64[D]')
+    if len(holidays) == 0:
+        return naive
+    return np.busday_offset(naive, 0, roll='forward', weekmask=ALL_WEEK, holidays=holidays)
+
+
+def schedule_sends(delays, start_dates, business_days: bool = False, blackout_dates=None,
+                   labels: pd.DataFrame = None, weekmask: str = BUSINESS_WEEK) -> pd.DataFrame:
+    """Schedule of every email for every start date as a typed frame.
+
+    ``delays`` are days after the start (working days when ``business_days``).
+    Columns of ``labels`` (one row per email, e.g. number and subject) are
+    repeated for every cohort and placed after ``Email_Index``.
+    """
+    delays = np.asarray(delays, dtype='int64')
+    starts = to_days(start_dates)
+    sends = send_dates(delays, starts, business_days, blackout_dates, weekmask)
+
+    cohorts, emails = sends.shape
+    cohort_start = np.repeat(starts, emails)
+    send = sends.ravel()
+    # Shifted means moved by a blackout date, so compare with the same calendar without them
+    naive = send_dates(delays, starts, business_days, None, weekmask).ravel()
+    send_index = pd.DatetimeIndex(send.astype('datetime64[ns]'))
+
+    frame = pd.DataFrame({
+        'Cohort_Start': cohort_start.astype('datetime64[ns]'),
+        'Email_Index': np.tile(np.arange(emails, dtype='int64'), cohorts),
+        'Delay': np.tile(delays, cohorts),
+        'Send_Date': send_index,
+        'Day_Of_Week': pd.Categorical(send_index.day_name(), categories=WEEKDAYS),
+        'Days_From_Start': (send - cohort_start).astype('int64'),
+        'Shifted': send != naive
+    })
+
+    if labels is not None and len(labels.columns):
+        repeated = labels.iloc[np.tile(np.arange(emails), cohorts)].reset_index(drop=True)
+        for position, column in enumerate(repeated.columns, start=2):
+            frame.insert(position, column, repeated[column].to_numpy())
+    return frame
+
+
+def signup_distribution(start_date, end_date, per_day: float) -> pd.Series:
+    """Constant number of new subscribers on every day of a date range"""
+    days = pd.date_range(pd.Timestamp(start_date), pd.Timestamp(end_date), freq='D', name='Signup_Date')
+    return pd.Series(float(per_day), index=days, name='Signups')
+
+
+def project_volume(signups: pd.Series, delays, business_days: bool = False, blackout_dates=None,
+                   by_email: bool = False, names: list = None, weekmask: str = BUSINESS_WEEK) -> pd.DataFrame:
+    """Forecast of sends per day for subscribers joining as given by ``signups``.
+
+    ``signups`` maps signup dates to cohort sizes; missing days count as zero.
+    Returns a frame indexed by ``Send_Date`` with ``Signups`` and ``Sends``
+    columns, plus one column per email (``names`` or ``Email_<n>``) when
+    ``by_email`` is set.
+    """
+    delays = np.asarray(delays, dtype='int64')
+    if (delays < 0).any():
+        raise ValueError("Delays cannot be negative")
+
+    signups = signups.groupby(to_days(signups.index)).sum() if len(signups) else signups
+    if len(signups) == 0 or len(delays) == 0:
+        return pd.DataFrame(columns=['Signups', 'Sends'], index=pd.DatetimeIndex([], name='Send_Date'))
+
+    first = signups.index.min()
+    span = int((signups.index.max() - first).days) + 1
+    cohort_days = (to_days(signups.index) - to_days([first])[0]).astype('int64')
+    sizes = np.zeros(span)
+    sizes[cohort_days] = signups.to_numpy(dtype=float)
+    calendar = business_days or (blackout_dates is not None and len(blackout_dates) > 0)
+
+    if not calendar:
+        # Daily sends are the cohort sizes convolved with the delay histogram
+        length = span + int(delays.max())
+        total = np.convolve(sizes, np.bincount(delays).astype(float))
+        if by_email:
+            per_email = np.zeros((len(delays), length))
+            per_email[np.arange(len(delays))[:, None], delays[:, None] + np.arange(span)[None, :]] = sizes
+    else:
+        starts = to_days([first])[0] + np.arange(span).astype('timedelta64[D]')
+        offsets = (send_dates(delays, starts, business_days, blackout_dates, weekmask) - starts[0]).astype('int64')
+        length = int(offsets.max()) + 1
+        weights = np.repeat(sizes, len(delays))
+        total = np.bincount(offsets.ravel(), weights=weights, minlength=length)
+        if by_email:
+            # Bin each email into its own stretch of one flat array
+            flat = (offsets + np.arange(len(delays))[None, :] * length).ravel()
+            per_email = np.bincount(flat, weights=weights, minlength=len(delays) * length).reshape(len(delays), length)
+
+    index = pd.date_range(pd.Timestamp(first), periods=length, freq='D', name='Send_Date')
+    forecast = pd.DataFrame({
+        'Signups': np.pad(sizes, (0, length - span)),
+        'Sends': total[:length]
+    }, index=index)
+    if by_email:
+        names = names if names is not None else [f"Email_{position + 1}" for position in range(len(delays))]
+        forecast = pd.concat([forecast, pd.DataFrame(per_email.T, index=index, columns=names)], axis=1)
+    return forecast
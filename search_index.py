@@ -0,0 +1,315 @@
+"""Full-text search over the newsletter corpus.
+
+An inverted index maps each token of the week number, title, subject and
+visible body text (markup stripped) to the emails and token positions it
+occurs at. Queries are answered from the postings instead of scanning every
+HTML body with ``str.contains``:
+
+* bare words match as prefixes (``promo`` finds "promotion"),
+* ``"quoted words"`` must appear as a consecutive phrase,
+* all parts of a query must match (AND).
+
+``rank`` orders the matches with BM25 (title and subject hits weigh more than
+body hits) and returns a small projection per email with a snippet of the
+matching passage, cut from the visible text kept at index time.
+
+Documents are analysed once per content hash, so re-indexing a reloaded
+sheet only tokenizes the emails that changed. ``shared_index`` keeps one
+index per sheet for the whole process; each reload syncs it instead of
+building a new one.
+"""
+import bisect
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import islice
+
+from content_cache import content_hash, shared, shared_cache
+from html_tools import visible_text
+
+FIELDS = ('number', 'title', 'subject', 'body')
+FIELD_BODY = FIELDS.index('body')
+
+# Positions of different fields never touch, so phrases cannot span fields
+FIELD_STRIDE = 1 << 32
+
+# BM25 parameters and per-field term weights
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = (1.0, 3.0, 2.0, 1.0)
+
+# Tokens of context shown around the first match in a snippet
+SNIPPET_BEFORE = 8
+SNIPPET_AFTER = 24
+
+_TOKEN = re.compile(r'\w+')
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+# Per-document token positions, reused by every index
+DOCUMENT_CACHE = shared_cache('search-documents', max_bytes=128 * 1024 * 1024,
+                              sizer=lambda document: document['size'])
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens of a piece of text"""
+    # Matched on the original text: lowercasing first can change the length
+    # of the string (e.g. "İ"), and snippet spans must line up with positions
+    return [match.group().lower() for match in _TOKEN.finditer(str(text))]
+
+
+def analyze_document(number, title, subject, html_content) -> dict:
+    """Token positions of an email across all fields, plus its body text for snippets"""
+    body = ' '.join(visible_text(html_content).split())
+    values = (number, title, subject, body)
+    positions = {}
+    length = 0
+    for field_index, value in enumerate(values):
+        base = field_index * FIELD_STRIDE
+        tokens = tokenize(value)
+        for offset, token in enumerate(tokens):
+            token_positions = positions.get(token)
+            if token_positions is None:
+                token_positions = positions[token] = array('q')
+            token_positions.append(base + offset)
+        length += len(tokens)
+    size = sys.getsizeof(body) + sys.getsizeof(positions) + sum(
+        sys.getsizeof(token) + sys.getsizeof(token_positions) for token, token_positions in positions.items()
+    )
+    return {
+        'week': number,
+        'title': str(title),
+        'positions': positions,
+        'length': length,
+        'body': body,
+        # The body is the last field; snippet spans are found again from it,
+        # only for the hits shown
+        'body_tokens': len(tokens),
+        'size': size
+    }
+
+
+def snippet(document: dict, positions: list) -> str:
+    """Passage of the body around the first matching position, matches in bold"""
+    body_start = FIELD_BODY * FIELD_STRIDE
+    hits = sorted(p - body_start for p in positions if p >= body_start)
+    total = document['body_tokens']
+    if not total:
+        return ''
+    first = hits[0] if hits else 0
+    start = max(0, first - SNIPPET_BEFORE)
+    end = min(total, first + SNIPPET_AFTER)
+    body = document['body']
+    spans = [match.span() for match in islice(_TOKEN.finditer(body), start, end)]
+
+    parts = ['…' if start > 0 else '']
+    cursor = spans[0][0]
+    for position in hits:
+        if start <= position < end:
+            token_start, token_end = spans[position - start]
+            parts.append(body[cursor:token_start])
+            parts.append(f"**{body[token_start:token_end]}**")
+            cursor = token_end
+    parts.append(body[cursor:spans[-1][1]])
+    parts.append('…' if end < total else '')
+    return ''.join(parts)
+
+
+class SearchIndex:
+    """Inverted index with token positions, kept in sync one email at a time.
+
+    ``version`` is the data version of the frame it was last synced with;
+    ``lock`` guards an index shared between sessions. ``size`` is the
+    approximate memory held by its documents, in bytes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.size = 0
+        self.lock = threading.Lock()
+        self._docs = {}
+        self._postings = {}
+        self._vocabulary = []
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Index every row of a newsletter frame (keyed by index label)"""
+        index = cls()
+        index.sync(frame)
+        return index
+
+    def update(self, doc_id, number, title, subject, html_content) -> bool:
+        """(Re)index one email; returns False when its content did not change"""
+        key = content_hash('\x1f'.join(str(v) for v in (number, title, subject, html_content)))
+        current = self._docs.get(doc_id)
+        if current is not None and current[0] == key:
+            return False
+
+        document = DOCUMENT_CACHE.get(key)
+        if document is None:
+            document = analyze_document(number, title, subject, html_content)
+            DOCUMENT_CACHE.put(key, document)
+
+        self.remove(doc_id)
+        self._docs[doc_id] = (key, document)
+        self._total_length += document['length']
+        self.size += document['size']
+        for token, token_positions in document['positions'].items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                bisect.insort(self._vocabulary, token)
+            postings[doc_id] = token_positions
+        return True
+
+    def remove(self, doc_id):
+        """Drop an email from the index"""
+        current = self._docs.pop(doc_id, None)
+        if current is None:
+            return
+        self._total_length -= current[1]['length']
+        self.size -= current[1]['size']
+        for token in current[1]['positions']:
+            postings = self._postings[token]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def sync(self, frame, version: str = None) -> int:
+        """Bring the index in line with a frame; returns the number of re-indexed emails"""
+        self.version = version
+        changed = 0
+        rows = zip(
+            frame.index.tolist(),
+            frame['Email_Number'].tolist(),
+            frame['Title'].tolist(),
+            frame['Subject_Line'].tolist(),
+            frame['Complete_HTML_Code'].tolist()
+        )
+        for doc_id, number, title, subject, html_content in rows:
+            changed += self.update(doc_id, number, title, subject, html_content)
+        for doc_id in set(self._docs) - set(frame.index.tolist()):
+            self.remove(doc_id)
+            changed += 1
+        return changed
+
+    def _prefix_terms(self, prefix: str) -> list:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff')
+        return self._vocabulary[start:end]
+
+    def _term_docs(self, prefix: str) -> set:
+        docs = set()
+        for term in self._prefix_terms(prefix):
+            docs.update(self._postings[term])
+        return docs
+
+    def _phrase_docs(self, tokens: list) -> set:
+        postings = [self._postings.get(token, {}) for token in tokens]
+        docs = set(postings[0]).intersection(*postings[1:])
+        matches = set()
+        for doc_id in docs:
+            following = [set(p[doc_id]) for p in postings[1:]]
+            for start in postings[0][doc_id]:
+                if all(start + i + 1 in positions for i, positions in enumerate(following)):
+                    matches.add(doc_id)
+                    break
+        return matches
+
+    def search(self, query: str):
+        """Ids of the emails matching every part of the query (None for an empty query)"""
+        result = None
+        for phrase, word in _QUERY.findall(query or ''):
+            tokens = tokenize(phrase if phrase else word)
+            if not tokens:
+                continue
+            if phrase and len(tokens) > 1:
+                docs = self._phrase_docs(tokens)
+            elif phrase:
+                docs = set(self._postings.get(tokens[0], {}))
+            else:
+                # A bare word may split into several tokens ("e-mail"); each is a prefix
+                docs = self._term_docs(tokens[0])
+                for token in tokens[1:]:
+                    docs &= self._term_docs(token)
+            result = docs if result is None else result & docs
+            if not result:
+                return set()
+        return result
+
+    def _bm25(self, doc_id, terms: list, average_length: float) -> float:
+        document = self._docs[doc_id][1]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * document['length'] / average_length)
+        score = 0.0
+        for term in terms:
+            postings = self._postings[term]
+            positions = postings.get(doc_id)
+            if not positions:
+                continue
+            tf = sum(FIELD_WEIGHTS[p // FIELD_STRIDE] for p in positions)
+            idf = math.log(1 + (len(self._docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return score
+
+    def rank(self, query: str, limit: int = None) -> list:
+        """Matching emails, best first, as dicts of doc_id, week, title, score and snippet"""
+        matches = self.search(query)
+        if not matches:
+            return []
+
+        terms = []
+        for phrase, word in _QUERY.findall(query):
+            for token in tokenize(phrase if phrase else word):
+                terms.extend([token] if phrase else self._prefix_terms(token))
+        terms = [term for term in dict.fromkeys(terms) if term in self._postings]
+        average_length = max(1.0, self._total_length / max(1, len(self._docs)))
+
+        scored = sorted(
+            ((self._bm25(doc_id, terms, average_length), doc_id) for doc_id in matches),
+            key=lambda item: -item[0]
+        )
+        if limit is not None:
+            scored = scored[:limit]
+
+        hits = []
+        for score, doc_id in scored:
+            document = self._docs[doc_id][1]
+            positions = [p for term in terms for p in self._postings[term].get(doc_id, ())]
+            hits.append({
+                'doc_id': doc_id,
+                'week': document['week'],
+                'title': document['title'],
+                'score': round(score, 2),
+                'snippet': snippet(document, positions)
+            })
+        return hits
+
+
+# One index per sheet; the least recently used ones are dropped over these limits
+SHARED_INDEXES = shared('search-indexes', OrderedDict)
+MAX_SHARED_INDEXES = 8
+MAX_SHARED_INDEX_BYTES = 256 * 1024 * 1024
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_index(source) -> SearchIndex:
+    """The process-wide index of a sheet (``source`` identifies it), created on first use"""
+    with _SHARED_LOCK:
+        index = SHARED_INDEXES.get(source)
+        if index is None:
+            index = SHARED_INDEXES[source] = SearchIndex()
+        SHARED_INDEXES.move_to_end(source)
+        total = sum(shared.size for shared in SHARED_INDEXES.values())
+        # Always keep the index being asked for
+        while len(SHARED_INDEXES) > 1 and (len(SHARED_INDEXES) > MAX_SHARED_INDEXES
+                                           or total > MAX_SHARED_INDEX_BYTES):
+            _, evicted = SHARED_INDEXES.popitem(last=False)
+            total -= evicted.size
+        return index
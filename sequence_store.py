@@ -0,0 +1,330 @@
+"""Content-addressed storage of sequence email bodies.
+
+Every body the sequence builder generates is the same ~2 KB template chrome
+wrapped around a small piece of content, and each email used to keep its own
+full copy of it. An ``EmailSequence`` keeps the chrome once (module level)
+and each email only its ``content``, ``header_img`` and ``footer_img``;
+every distinct content string is stored once (by hash) and shared by the
+emails that use it. Bodies that do not follow the template are kept whole.
+
+``to_json`` turns the sequence back into the existing ``email_body`` shape
+for exports, backups and validation. Full bodies are assembled from the
+compiled template on demand and memoized per (content hash, header, footer),
+using the hash the blob store already computed.
+"""
+import uuid
+from typing import Dict, List
+
+from content_cache import ContentCache, content_hash, shared
+
+EMAIL_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>VIDeMI Services</title>
+</head>
+<body style="margin: 0; padding: 0; font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; background-color: #f4f4f4;">
+    <table role="presentation" style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td align="center" style="padding: 0;">
+                <table role="presentation" style="width: 600px; border-collapse: collapse; background-color: #ffffff; margin: 20px auto;">
+                    <tr>
+                        <td style="padding: 0;">
+                            <div class="header-image">
+                                <img src="{header_img}" alt="VIDeMI Services Header" style="width: 100%; height: auto; display: block; border: 0;">
+                            </div>
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 40px 30px;">
+                            {content}
+                        </td>
+                    </tr>
+                    <tr>
+                        <td style="padding: 0;">
+                            <div class="footer-image">
+                                <img src="{footer_img}" alt="VIDeMI Services Footer" style="width: 100%; height: auto; display: block; border: 0;">
+                            </div>
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>'''
+
+
+class CompiledTemplate:
+    """Email template split once into static segments, with rendered outputs memoized.
+
+    Rendering joins the static segments with the header URL, content and
+    footer URL instead of reformatting the whole template. When the caller
+    already knows the content hash, results are kept in an LRU keyed by
+    (content hash, header, footer); hashing the content just to look it up
+    would cost as much as the join itself.
+    """
+
+    FIELDS = ('{header_img}', '{content}', '{footer_img}')
+
+    def __init__(self, template: str, max_entries: int = 512):
+        segments = []
+        rest = template
+        for field in self.FIELDS:
+            before, rest = rest.split(field)
+            segments.append(before)
+        segments.append(rest)
+        self.segments = tuple(segments)
+        self.cache = ContentCache(max_entries=max_entries)
+
+    def assemble(self, content: str, header_img: str, footer_img: str) -> str:
+        """Full HTML, built without consulting the cache"""
+        prefix, after_header, after_content, suffix = self.segments
+        return ''.join((prefix, header_img, after_header, content, after_content, footer_img, suffix))
+
+    def render(self, content: str, header_img: str, footer_img: str, digest: str = None) -> str:
+        """Full HTML of a piece of content; memoized when ``digest`` (its hash) is given"""
+        if digest is None:
+            return self.assemble(content, header_img, footer_img)
+        key = (digest, header_img, footer_img)
+        html = self.cache.get(key)
+        if html is None:
+            html = self.assemble(content, header_img, footer_img)
+            self.cache.put(key, html)
+        return html
+
+    def parse(self, html: str):
+        """``(content, header_img, footer_img)`` of a body built from this template, else None"""
+        prefix, after_header, after_content, suffix = self.segments
+        if not html.startswith(prefix) or not html.endswith(suffix):
+            return None
+        header_end = html.find(after_header, len(prefix))
+        # The content may contain anything, the footer URL cannot contain the chrome
+        content_end = html.rfind(after_content, 0, len(html) - len(suffix))
+        if header_end < 0 or content_end < header_end + len(after_header):
+            return None
+        header_img = html[len(prefix):header_end]
+        content = html[header_end + len(after_header):content_end]
+        footer_img = html[content_end + len(after_content):len(html) - len(suffix)]
+        if self.assemble(content, header_img, footer_img) != html:
+            return None
+        return content, header_img, footer_img
+
+
+COMPILED_TEMPLATE = shared('compiled-template', lambda: CompiledTemplate(EMAIL_TEMPLATE))
+
+
+def render_template(content: str, header_img: str, footer_img: str) -> str:
+    """Full email HTML of a piece of content inside the template chrome"""
+    return COMPILED_TEMPLATE.render(content, header_img, footer_img)
+
+
+def parse_template(html: str):
+    """``(content, header_img, footer_img)`` of a body built from the template, else None"""
+    return COMPILED_TEMPLATE.parse(html)
+
+
+BODY_FIELDS = ('content', 'header_img', 'footer_img')
+
+
+def migrate_email(email: Dict) -> Dict:
+    """Structured copy of an email saved with a full ``email_body``.
+
+    Template bodies are split into ``content``, ``header_img`` and
+    ``footer_img``; any other body is kept whole as ``content`` with no
+    images. The new fields take the place of ``email_body``.
+    """
+    if 'email_body' not in email:
+        return dict(email)
+    html = '' if email['email_body'] is None else str(email['email_body'])
+    parsed = parse_template(html)
+    fields = dict(zip(BODY_FIELDS, parsed if parsed is not None else (html, None, None)))
+
+    migrated = {}
+    for name, value in email.items():
+        if name == 'email_body':
+            migrated.update(fields)
+        else:
+            migrated[name] = value
+    return migrated
+
+
+class SequenceEmail(dict):
+    """Email dict that bumps its sequence's version whenever a field changes"""
+
+    sequence = None
+
+    def _changed(self):
+        if self.sequence is not None:
+            self.sequence.changes += 1
+
+    def __setitem__(self, name, value):
+        # Edit forms write every field back on each rerun; unchanged values are no change
+        if name not in self or self[name] != value:
+            self._changed()
+        super().__setitem__(name, value)
+
+    def __delitem__(self, name):
+        self._changed()
+        super().__delitem__(name)
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **fields):
+        for name, value in dict(*args, **fields).items():
+            self[name] = value
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def clear(self):
+        self._changed()
+        super().clear()
+
+
+def _changes_sequence(method):
+    def changed(self, *args, **kwargs):
+        self.changes += 1
+        return method(self, *args, **kwargs)
+    changed.__name__ = method.__name__
+    changed.__doc__ = method.__doc__
+    return changed
+
+
+class EmailSequence(list):
+    """Structured sequence emails with their content interned in a blob store.
+
+    Each email is a dict holding ``content``, ``header_img`` and
+    ``footer_img`` (both None for bodies that do not use the template) in
+    place of ``email_body``. Identical contents share one string, and the
+    full HTML is only assembled when an email is rendered or exported.
+
+    ``version`` changes whenever the list or any of its emails does, so
+    exports can be cached without serializing the sequence to compare it.
+    """
+
+    def __init__(self, emails=()):
+        super().__init__()
+        self.blobs = {}
+        # id of each stored blob -> its hash, so rendering never re-hashes content
+        self.digests = {}
+        # Unique per sequence: versions of different sessions never collide
+        self.uid = uuid.uuid4().hex
+        self.changes = 0
+        for email in emails:
+            self.add(email)
+
+    @property
+    def version(self) -> str:
+        """Identifies the current state of the sequence"""
+        return f"{self.uid}:{self.changes}"
+
+    def _attach(self, email: Dict) -> SequenceEmail:
+        if not isinstance(email, SequenceEmail) or email.sequence is not self:
+            email = SequenceEmail(email)
+            email.sequence = self
+        return email
+
+    @_changes_sequence
+    def append(self, email: Dict):
+        super().append(self._attach(email))
+
+    @_changes_sequence
+    def insert(self, position: int, email: Dict):
+        super().insert(position, self._attach(email))
+
+    @_changes_sequence
+    def extend(self, emails):
+        super().extend(self._attach(email) for email in emails)
+
+    @_changes_sequence
+    def __setitem__(self, position, value):
+        if isinstance(position, slice):
+            value = [self._attach(email) for email in value]
+        else:
+            value = self._attach(value)
+        super().__setitem__(position, value)
+
+    def __iadd__(self, emails):
+        self.extend(emails)
+        return self
+
+    __delitem__ = _changes_sequence(list.__delitem__)
+    pop = _changes_sequence(list.pop)
+    remove = _changes_sequence(list.remove)
+    clear = _changes_sequence(list.clear)
+    sort = _changes_sequence(list.sort)
+    reverse = _changes_sequence(list.reverse)
+    __imul__ = _changes_sequence(list.__imul__)
+
+    @classmethod
+    def from_json(cls, emails: List[Dict]) -> 'EmailSequence':
+        """Sequence from a JSON file, migrating ``email_body`` emails once on load"""
+        return cls(emails)
+
+    def intern(self, text: str) -> str:
+        """The stored copy of a content blob (stored on first sight)"""
+        digest = content_hash(text)
+        stored = self.blobs.setdefault(digest, text)
+        self.digests[id(stored)] = digest
+        return stored
+
+    def digest(self, text: str):
+        """Hash of a stored blob, or None for a string not from the store"""
+        digest = self.digests.get(id(text))
+        return digest if digest is not None and self.blobs.get(digest) is text else None
+
+    def add(self, email: Dict) -> Dict:
+        """Append an email (structured or with ``email_body``); returns the stored email"""
+        email = migrate_email(email)
+        email['content'] = self.intern(email.get('content') or '')
+        email.setdefault('header_img', None)
+        email.setdefault('footer_img', None)
+        self.append(email)
+        return self[-1]
+
+    def set_content(self, email: Dict, content: str, header_img: str = None, footer_img: str = None):
+        """Replace an email's content; template emails also take the given images"""
+        email['content'] = self.intern(content)
+        if email.get('header_img') is not None and header_img is not None:
+            email['header_img'] = header_img
+        if email.get('footer_img') is not None and footer_img is not None:
+            email['footer_img'] = footer_img
+
+    def body(self, email: Dict) -> str:
+        """Full HTML of an email, rendered from its fields"""
+        if email.get('header_img') is None or email.get('footer_img') is None:
+            return email.get('content', '')
+        content = email['content']
+        return COMPILED_TEMPLATE.render(content, email['header_img'], email['footer_img'], self.digest(content))
+
+    def email_json(self, email: Dict) -> Dict:
+        """One email in the JSON shape (``email_body`` where the body fields are)"""
+        result = {}
+        for name, value in email.items():
+            if name == 'content':
+                result['email_body'] = self.body(email)
+            elif name not in BODY_FIELDS:
+                result[name] = value
+        return result
+
+    def to_json(self) -> List[Dict]:
+        """The whole sequence in the JSON shape"""
+        return [self.email_json(email) for email in self]
+
+    def compact(self) -> int:
+        """Drop blobs no email refers to any more; returns how many were dropped"""
+        live = {id(email.get('content')) for email in self}
+        dead = [key for key, text in self.blobs.items() if id(text) not in live]
+        for key in dead:
+            del self.digests[id(self.blobs.pop(key))]
+        return len(dead)
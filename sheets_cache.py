@@ -0,0 +1,130 @@
+"""Process-wide cache of Google Sheets data shared by every browser session.
+
+Streamlit re-executes the app script on each interaction but keeps imported
+modules alive, so a module-level cache is shared across sessions and tabs.
+Entries are keyed by (credential identity, spreadsheet ID, worksheet gid), so
+a session only ever gets data loaded with its own service account. Within the
+TTL an entry is served without any API call; after it, the Drive
+``modifiedTime`` of the spreadsheet is checked and the sheet is only
+re-pulled when it changed (or when the check fails).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from content_cache import shared
+
+
+def frame_size(frame) -> int:
+    """Approximate memory footprint of a cached DataFrame (or store wrapping one) in bytes"""
+    frame = getattr(frame, 'frame', frame)
+    try:
+        return int(frame.memory_usage(deep=True).sum())
+    except Exception:
+        return 0
+
+
+def client_identity(client) -> str:
+    """Service account (or other credential) a gspread client is authorized as"""
+    auth = getattr(client, 'auth', None) or getattr(getattr(client, 'http_client', None), 'auth', None)
+    identity = getattr(auth, 'service_account_email', None) or getattr(auth, 'client_id', None)
+    # Unknown credentials never share entries with anyone else
+    return identity or f"client-{id(client)}"
+
+
+def fetch_revision(client, spreadsheet_id: str):
+    """Return the Drive modifiedTime of a spreadsheet, or None if unavailable"""
+    try:
+        return client.get_file_drive_metadata(spreadsheet_id).get('modifiedTime')
+    except Exception:
+        return None
+
+
+class SheetCache:
+    """TTL + revision-aware cache with LRU size-based eviction"""
+
+    def __init__(self, ttl: float = 60, max_entries: int = 16, max_bytes: int = 512 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.stats = {'hits': 0, 'revalidated': 0, 'loads': 0, 'evictions': 0}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _fresh_entry(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['checked'] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry
+        return None
+
+    def get(self, client, spreadsheet_id: str, sheet_id, loader):
+        """Return the cached frame for a worksheet, calling ``loader()`` on a miss.
+
+        Concurrent sessions asking for the same sheet share a single load.
+        """
+        key = (client_identity(client), spreadsheet_id, None if sheet_id is None else str(sheet_id))
+
+        entry = self._fresh_entry(key, time.monotonic())
+        if entry is not None:
+            return entry['frame']
+
+        with self._key_lock(key):
+            # Another session may have refreshed it while we waited
+            entry = self._fresh_entry(key, time.monotonic())
+            if entry is not None:
+                return entry['frame']
+
+            revision = fetch_revision(client, spreadsheet_id)
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and revision is not None and entry['revision'] == revision:
+                    entry['checked'] = time.monotonic()
+                    self._entries.move_to_end(key)
+                    self.stats['revalidated'] += 1
+                    return entry['frame']
+
+            frame = loader()
+            self._store(key, frame, revision)
+            return frame
+
+    def _store(self, key, frame, revision):
+        with self._lock:
+            self._entries[key] = {
+                'frame': frame,
+                'revision': revision,
+                'checked': time.monotonic(),
+                'size': frame_size(frame)
+            }
+            self._entries.move_to_end(key)
+            self.stats['loads'] += 1
+            self._evict()
+
+    def _evict(self):
+        total = sum(entry['size'] for entry in self._entries.values())
+        # Always keep the most recently used entry
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry['size']
+            self.stats['evictions'] += 1
+
+    def invalidate(self, spreadsheet_id: str = None, sheet_id=None):
+        """Drop cached data for one spreadsheet (all of its worksheets) or everything"""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[1] == spreadsheet_id]:
+                if sheet_id is None or key[2] == str(sheet_id):
+                    del self._entries[key]
+
+
+SHEET_CACHE = shared('sheets', SheetCache)
@@ -0,0 +1,106 @@
+"""Shared Google Sheets loader for the newsletter apps.
+
+Fetches only the four newsletter columns with a single ``batch_get`` request
+and builds a typed DataFrame column-wise.
+"""
+import pandas as pd
+
+REQUIRED_COLUMNS = ['Email_Number', 'Title', 'Subject_Line', 'Complete_HTML_Code']
+
+# Column layout the apps write to (A=Email_Number ... D=Complete_HTML_Code)
+DEFAULT_COLUMN_LETTERS = {
+    'Email_Number': 'A',
+    'Title': 'B',
+    'Subject_Line': 'C',
+    'Complete_HTML_Code': 'D'
+}
+
+
+def column_letter(index: int) -> str:
+    """Convert a zero-based column index to a sheet column letter"""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def open_worksheet(client, spreadsheet_id: str, sheet_id=None):
+    """Open a worksheet by gid, falling back to the first worksheet"""
+    spreadsheet = client.open_by_key(spreadsheet_id)
+    if sheet_id not in (None, ''):
+        try:
+            return spreadsheet.get_worksheet_by_id(int(sheet_id))
+        except Exception:
+            pass
+    return spreadsheet.get_worksheet(0)
+
+
+def locate_columns(worksheet) -> dict:
+    """Find the column letter of each required header in the first row"""
+    headers = worksheet.row_values(1)
+    return {
+        name: column_letter(headers.index(name))
+        for name in REQUIRED_COLUMNS
+        if name in headers
+    }
+
+
+def fetch_columns(worksheet, letters: dict) -> dict:
+    """Fetch the given columns (header included) in one batch_get request"""
+    names = list(letters)
+    if not names:
+        return {}
+    ranges = [f"{letters[name]}:{letters[name]}" for name in names]
+    value_ranges = worksheet.batch_get(ranges, major_dimension='COLUMNS')
+    columns = {}
+    for name, value_range in zip(names, value_ranges):
+        columns[name] = list(value_range[0]) if value_range else []
+    return columns
+
+
+def build_email_frame(columns: dict) -> pd.DataFrame:
+    """Build a typed newsletter frame from header-less column lists.
+
+    The index is the zero-based data row position, so ``index + 2`` is the
+    sheet row number used by the write paths.
+    """
+    n_rows = max((len(values) for values in columns.values()), default=0)
+    data = {}
+    for name in REQUIRED_COLUMNS:
+        values = columns.get(name, [])
+        # The API trims trailing empty cells, so pad every column to the same length
+        data[name] = values + [''] * (n_rows - len(values))
+
+    df = pd.DataFrame(data)
+    df['Email_Number'] = pd.to_numeric(df['Email_Number'], errors='coerce')
+    df = df.dropna(subset=['Email_Number'])
+    df['Email_Number'] = df['Email_Number'].astype(int)
+    for name in REQUIRED_COLUMNS[1:]:
+        df[name] = df[name].astype(str)
+
+    return df.sort_values('Email_Number', kind='stable')
+
+
+def load_email_frame(worksheet, strict: bool = False) -> pd.DataFrame:
+    """Load the newsletter columns of a worksheet into a typed DataFrame.
+
+    Assumes the default A-D layout and verifies it against the header cells
+    returned by the same request; only when the sheet uses a different layout
+    is the header row read to locate the columns and the data refetched.
+    """
+    columns = fetch_columns(worksheet, DEFAULT_COLUMN_LETTERS)
+    layout_matches = all(
+        values and values[0] == name for name, values in columns.items()
+    )
+
+    if not layout_matches:
+        letters = locate_columns(worksheet)
+        missing = [name for name in REQUIRED_COLUMNS if name not in letters]
+        if missing and strict:
+            raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+        columns = fetch_columns(worksheet, letters)
+
+    # Drop the header cell from each column
+    return build_email_frame({name: values[1:] for name, values in columns.items()})
@@ -0,0 +1,192 @@
+"""Batched write path for the newsletter worksheet.
+
+Cell changes are collected first and committed with as few ``batch_update``
+requests as possible instead of one ``update`` call per cell.
+"""
+import numpy as np
+import pandas as pd
+
+from sheets_loader import DEFAULT_COLUMN_LETTERS, REQUIRED_COLUMNS
+
+TEXT_COLUMNS = REQUIRED_COLUMNS[1:]
+
+# Stay well below the Sheets API request payload limit
+MAX_REQUEST_CHARS = 2_000_000
+MAX_RANGES_PER_REQUEST = 500
+
+
+def sheet_rows(frame) -> list:
+    """Sheet row numbers of the rows of a loaded newsletter frame (header is row 1)"""
+    return [int(position) + 2 for position in frame.index]
+
+
+class CellBatch:
+    """Collects cell changes and commits them in chunked batch_update requests"""
+
+    def __init__(self, worksheet, max_request_chars: int = MAX_REQUEST_CHARS,
+                 max_ranges: int = MAX_RANGES_PER_REQUEST):
+        self.worksheet = worksheet
+        self.max_request_chars = max_request_chars
+        self.max_ranges = max_ranges
+        self._cells = {}
+
+    def __len__(self):
+        return len(self._cells)
+
+    def set(self, row: int, column: str, value):
+        """Queue a single cell change; later changes to the same cell win"""
+        self._cells[(DEFAULT_COLUMN_LETTERS[column], int(row))] = value
+
+    def set_column(self, column: str, rows, values):
+        """Queue changes for one column over many rows"""
+        for row, value in zip(rows, values):
+            self.set(row, column, value)
+
+    def _ranges(self) -> list:
+        """Coalesce queued cells into contiguous single-column ranges"""
+        ranges = []
+        current = None
+        for (letter, row) in sorted(self._cells):
+            value = self._cells[(letter, row)]
+            if current and current['letter'] == letter and current['end'] == row - 1:
+                current['end'] = row
+                current['values'].append([value])
+            else:
+                current = {'letter': letter, 'start': row, 'end': row, 'values': [[value]]}
+                ranges.append(current)
+        return [
+            {'range': f"{r['letter']}{r['start']}:{r['letter']}{r['end']}", 'values': r['values']}
+            for r in ranges
+        ]
+
+    def _chunks(self, ranges: list) -> list:
+        """Split ranges into request-sized chunks"""
+        chunks = []
+        chunk = []
+        chunk_chars = 0
+        for value_range in ranges:
+            size = sum(len(str(row[0])) for row in value_range['values'])
+            if chunk and (chunk_chars + size > self.max_request_chars or len(chunk) >= self.max_ranges):
+                chunks.append(chunk)
+                chunk = []
+                chunk_chars = 0
+            chunk.append(value_range)
+            chunk_chars += size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def commit(self) -> int:
+        """Send all queued changes and return the number of API requests made"""
+        if not self._cells:
+            return 0
+        chunks = self._chunks(self._ranges())
+        for chunk in chunks:
+            self.worksheet.batch_update(chunk, value_input_option='RAW')
+        self._cells.clear()
+        return len(chunks)
+
+
+def row_ranges(rows) -> list:
+    """Coalesce sheet row numbers into sorted, inclusive (start, end) runs"""
+    ranges = []
+    for row in sorted(set(int(r) for r in rows)):
+        if ranges and ranges[-1][1] == row - 1:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+def delete_rows_batch(worksheet, rows) -> dict:
+    """Delete many sheet rows with a single batchUpdate request.
+
+    Rows are coalesced into contiguous ranges and deleted bottom-up inside the
+    one request, so the row numbers computed beforehand stay valid and nothing
+    has to be re-read between deletes.
+    """
+    ranges = row_ranges(rows)
+    if not ranges:
+        return {'rows': 0, 'ranges': 0, 'requests': 0, 'calls_saved': 0}
+
+    requests = [
+        {
+            'deleteDimension': {
+                'range': {
+                    'sheetId': worksheet.id,
+                    'dimension': 'ROWS',
+                    'startIndex': start - 1,
+                    'endIndex': end
+                }
+            }
+        }
+        for start, end in reversed(ranges)
+    ]
+    worksheet.spreadsheet.batch_update({'requests': requests})
+
+    deleted = sum(end - start + 1 for start, end in ranges)
+    return {
+        'rows': deleted,
+        'ranges': len(ranges),
+        'requests': 1,
+        # The old path issued one delete_rows call per row
+        'calls_saved': deleted - 1
+    }
+
+
+def plan_csv_upsert(existing_df, import_df, overwrite: bool = False) -> pd.DataFrame:
+    """Diff an imported CSV against the loaded sheet by Email_Number.
+
+    Returns one row per imported week with the new values, the target sheet
+    row and an ``Action`` of Insert, Update, Unchanged or Skip (exists but
+    overwrite is off). Nothing is written; this is the dry-run view.
+    """
+    incoming = import_df[REQUIRED_COLUMNS].copy()
+    incoming['Email_Number'] = pd.to_numeric(incoming['Email_Number'], errors='coerce')
+    incoming = incoming.dropna(subset=['Email_Number'])
+    incoming['Email_Number'] = incoming['Email_Number'].astype(int)
+    for column in TEXT_COLUMNS:
+        incoming[column] = incoming[column].fillna('').astype(str)
+    # The last occurrence of a week in the CSV wins
+    incoming = incoming.drop_duplicates('Email_Number', keep='last')
+
+    current = existing_df[REQUIRED_COLUMNS].drop_duplicates('Email_Number', keep='first')
+    current = current.assign(Sheet_Row=sheet_rows(current))
+    merged = incoming.merge(current, on='Email_Number', how='left', suffixes=('', '_current'))
+
+    is_new = merged['Sheet_Row'].isna()
+    changed = pd.DataFrame({
+        column: merged[column] != merged[f'{column}_current'].fillna('').astype(str)
+        for column in TEXT_COLUMNS
+    })
+    changed_fields = changed.apply(lambda row: ', '.join(row.index[row]), axis=1) if len(merged) else pd.Series(dtype=str)
+
+    plan = merged[REQUIRED_COLUMNS].copy()
+    plan['Sheet_Row'] = merged['Sheet_Row'].fillna(0).astype(int)
+    plan['Action'] = np.select(
+        [is_new, ~changed.any(axis=1), not overwrite],
+        ['Insert', 'Unchanged', 'Skip'],
+        default='Update'
+    )
+    plan['Changed_Fields'] = np.where(is_new, 'new row', changed_fields)
+    return plan.reset_index(drop=True)
+
+
+def apply_csv_upsert(worksheet, plan: pd.DataFrame) -> dict:
+    """Write a planned upsert: all updates in batch_update, all inserts in one append_rows"""
+    updates = plan[plan['Action'] == 'Update']
+    inserts = plan[plan['Action'] == 'Insert'].sort_values('Email_Number')
+
+    requests = 0
+    if len(updates) > 0:
+        batch = CellBatch(worksheet)
+        for column in TEXT_COLUMNS:
+            batch.set_column(column, updates['Sheet_Row'].tolist(), updates[column].tolist())
+        requests += batch.commit()
+
+    if len(inserts) > 0:
+        rows = inserts[REQUIRED_COLUMNS].values.tolist()
+        worksheet.append_rows([[int(row[0])] + row[1:] for row in rows], value_input_option='RAW')
+        requests += 1
+
+    return {'updated': len(updates), 'inserted': len(inserts), 'requests': requests}
@@ -0,0 +1,31 @@
+from content_cache import ContentCache
+
+
+def test_max_bytes_evicts_oldest():
+    cache = ContentCache(max_entries=10, max_bytes=10)
+    cache.put('a', b'12345')
+    cache.put('b', b'12345')
+    cache.put('c', b'123')
+    assert cache.get('a') is None and len(cache) == 2
+    assert cache.total_bytes == 8
+
+
+def test_oversized_value_is_kept_alone():
+    cache = ContentCache(max_bytes=4)
+    cache.put('a', b'12')
+    cache.put('b', b'123456')
+    assert len(cache) == 1 and cache.get('b') == b'123456'
+
+
+def test_replacing_value_updates_size():
+    cache = ContentCache(max_bytes=100)
+    cache.put('a', b'1234')
+    cache.put('a', b'12')
+    assert cache.total_bytes == 2
+
+
+def test_shared_cache_is_created_once():
+    from content_cache import REGISTRY, shared_cache
+    first = shared_cache('test-registry', max_entries=3)
+    assert shared_cache('test-registry') is first and REGISTRY['test-registry'] is first
+    assert first.max_entries == 3
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from content_cache import ContentCache
+import validation
+from email_metrics import compute_metrics
+
+
+def test_rows_survive_eviction_during_compute():
+    frame = pd.DataFrame({
+        'Email_Number': [1, 2, 3],
+        'Title': ['A', 'B', 'C'],
+        'Subject_Line': ['a', 'b', 'c'],
+        'Complete_HTML_Code': ['<p>one</p>', '<p>two words</p>', '<p>three more words</p>']
+    })
+    cache = ContentCache(max_entries=1)
+    compute_metrics(frame, cache)
+    # Cached and evicted bodies are mixed on the second run
+    metrics = compute_metrics(frame, cache)
+    assert metrics['Word_Count'].tolist() == [1, 2, 3]
+
+
+def test_structure_error_from_validation_findings(monkeypatch):
+    import html_tools
+    calls = []
+    original = html_tools.find_tag_mismatch
+    monkeypatch.setattr(validation, 'find_tag_mismatch', lambda code: calls.append(code) or original(code))
+    body = '<html><body><div><p>unclosed div</p></body></html><!-- structure test -->'
+    frame = pd.DataFrame({'Email_Number': [1], 'Title': ['A'], 'Subject_Line': ['a'],
+                          'Complete_HTML_Code': [body]})
+    metrics = compute_metrics(frame, ContentCache())
+    assert metrics['Structure_Error'].iloc[0].startswith('Expected </div>')
+    assert len(calls) == 1
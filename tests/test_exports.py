@@ -0,0 +1,22 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from exports import sequence_json_export, stamp_export
+
+
+def test_cached_sequence_json_is_stamped_per_download():
+    frame = pd.DataFrame({
+        'Email_Number': [1, 2],
+        'Title': ['One', 'Two'],
+        'Subject_Line': ['First', 'Second'],
+        'Complete_HTML_Code': ['<p>"created_at": "0000-00-00 00:00:00"</p>', '']
+    })
+    for pretty in (True, False):
+        _, artifact = sequence_json_export(frame, 'stamp-test', 'h.png', 'f.png', pretty=pretty)
+        data = json.loads(stamp_export(artifact['data'], datetime(2026, 1, 2, 3, 4, 5)))
+        assert data['sequence']['created_at'] == '2026-01-02 03:04:05'
+        assert [email['updated_at'] for email in data['emails']] == ['2026-01-02 03:04:05'] * 2
+        # Text inside a body is left alone
+        assert '"created_at": "0000-00-00 00:00:00"' in data['emails'][0]['email_body']
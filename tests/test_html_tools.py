@@ -0,0 +1,65 @@
+import html_tools
+from html_tools import extract_content
+
+PARAGRAPH = (
+    '<p style="color: #555555; font-size: 16px;">Keep your home <strong>spotless</strong> '
+    'all year with our <a href="https://example.com/book">weekly plans</a>.</p>\n'
+)
+
+
+def test_inline_tags_do_not_split_words():
+    assert extract_content('<p>un<b>believ</b>able</p>')['word_count'] == 1
+
+
+def test_block_tags_and_line_breaks_split_words():
+    assert extract_content('<p>one</p><p>two</p>three<br>four')['word_count'] == 4
+
+
+def test_invisible_markup_and_entities():
+    content = extract_content(
+        '<!DOCTYPE html><style>p { color: red; }</style><script>var x = 1;</script>'
+        '<!-- hidden --><P>Fish &amp; Chips</P>'
+    )
+    assert content['text'] == 'Fish & Chips'
+    assert content['word_count'] == 3
+
+
+def test_links_and_images():
+    content = extract_content(
+        '<a href="https://example.com/?a=1&amp;b=2">Book <em>now</em></a>'
+        '<a name="top">no href</a><IMG alt="Logo" SRC="logo.png">'
+    )
+    assert content['links'] == [{'href': 'https://example.com/?a=1&b=2', 'text': 'Book now'}]
+    assert content['images'] == [{'src': 'logo.png', 'alt': 'Logo'}]
+
+
+class CountingPattern:
+    """Compiled pattern that records how many characters each call scans"""
+
+    def __init__(self, pattern, scans):
+        self.pattern = pattern
+        self.scans = scans
+
+    def __getattr__(self, name):
+        method = getattr(self.pattern, name)
+
+        def call(*args, **kwargs):
+            text = next(arg for arg in args if isinstance(arg, str))
+            self.scans.append(len(text))
+            return method(*args, **kwargs)
+        return call
+
+
+def test_whole_document_passes_do_not_grow_with_size(monkeypatch):
+    scans = []
+    for name in ('_INVISIBLE', '_INLINE_TAG', '_INLINE_TAG_ANY_CASE', '_UPPER_CASE_TAG', '_TAG',
+                 '_ANCHOR', '_IMAGE', '_HREF', '_SRC', '_ALT'):
+        monkeypatch.setattr(html_tools, name, CountingPattern(getattr(html_tools, name), scans))
+
+    passes = []
+    for paragraphs in (40, 400):
+        body = '<html><body>' + PARAGRAPH * paragraphs + '</body></html>'
+        scans.clear()
+        extract_content(body)
+        passes.append(sum(1 for length in scans if length > len(body) // 2))
+    assert passes[0] == passes[1] <= 6
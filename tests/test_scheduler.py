@@ -0,0 +1,26 @@
+import numpy as np
+
+from scheduler import parse_dates, schedule_sends
+
+
+def test_parse_dates_mixed_formats():
+    dates, invalid = parse_dates("2025-12-25, 12/31/2025\n2026-01-01; bogus")
+    assert invalid == ['bogus']
+    assert list(dates) == list(np.array(['2025-12-25', '2025-12-31', '2026-01-01'], dtype='datetime64[D]'))
+
+
+def test_parse_dates_empty():
+    dates, invalid = parse_dates("")
+    assert len(dates) == 0 and invalid == []
+
+
+def test_business_days_not_shifted_by_weekends():
+    # Saturday start: every send lands on a weekday without any blackout date
+    frame = schedule_sends([0, 1, 5], ['2025-12-20'], business_days=True)
+    assert not frame['Shifted'].any()
+
+
+def test_blackout_date_shifts_send():
+    frame = schedule_sends([0, 1], ['2025-12-24'], business_days=True, blackout_dates=['2025-12-25'])
+    assert frame['Shifted'].tolist() == [False, True]
+    assert str(frame['Send_Date'].iloc[1].date()) == '2025-12-26'
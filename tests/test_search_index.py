@@ -0,0 +1,55 @@
+import pandas as pd
+
+import search_index
+from email_store import EmailStore
+from search_index import SearchIndex
+
+
+def frame(bodies):
+    return pd.DataFrame({
+        'Email_Number': list(range(1, len(bodies) + 1)),
+        'Title': [f"Week {n}" for n in range(1, len(bodies) + 1)],
+        'Subject_Line': ['Subject'] * len(bodies),
+        'Complete_HTML_Code': bodies
+    })
+
+
+def test_snippet_aligned_after_length_changing_lowercase():
+    index = SearchIndex.from_frame(frame(['<p>İstanbul İzmir offers a promo today</p>']))
+    hits = index.rank('promo')
+    assert '**promo**' in hits[0]['snippet']
+
+
+def test_reload_syncs_shared_index(monkeypatch):
+    analysed = []
+    original = search_index.analyze_document
+    monkeypatch.setattr(search_index, 'analyze_document', lambda *args: analysed.append(args) or original(*args))
+    search_index.SHARED_INDEXES.pop('test-sheet', None)
+    search_index.DOCUMENT_CACHE.clear()
+
+    first = EmailStore(frame(['<p>alpha</p>', '<p>beta</p>']), source='test-sheet')
+    assert first.search('alpha') == {0}
+    second = EmailStore(frame(['<p>alpha</p>', '<p>gamma</p>']), source='test-sheet')
+    assert second.search('gamma') == {1}
+    assert second.search('beta') == set()
+    # The unchanged email was not analysed again, and the old store still sees its own data
+    assert len(analysed) == 3
+    assert first.search('beta') == {1}
+
+
+def test_shared_indexes_are_bounded(monkeypatch):
+    monkeypatch.setattr(search_index, 'SHARED_INDEXES', search_index.OrderedDict())
+    monkeypatch.setattr(search_index, 'MAX_SHARED_INDEX_BYTES', 1)
+    first = search_index.shared_index('sheet-a')
+    first.sync(frame(['<p>alpha</p>']))
+    search_index.shared_index('sheet-b')
+    # Over the byte budget the least recently used sheet goes; the requested one stays
+    assert list(search_index.SHARED_INDEXES) == ['sheet-b']
+    assert search_index.shared_index('sheet-a') is not first
+
+
+def test_snippet_marks_match_in_long_body():
+    words = ' '.join(f"word{n}" for n in range(100))
+    index = SearchIndex.from_frame(frame([f"<p>{words} target {words}</p>"]))
+    text = index.rank('target')[0]['snippet']
+    assert text.startswith('…word92') and '**target**' in text and text.endswith('…')
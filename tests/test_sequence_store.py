@@ -0,0 +1,50 @@
+from sequence_store import COMPILED_TEMPLATE, EmailSequence, render_template
+
+
+def test_body_matches_template_and_is_memoized():
+    sequence = EmailSequence([{'title': 'One', 'content': '<p>Hi</p>', 'header_img': 'h.png', 'footer_img': 'f.png'}])
+    email = sequence[0]
+    expected = render_template('<p>Hi</p>', 'h.png', 'f.png')
+    before = COMPILED_TEMPLATE.cache.stats['hits']
+    assert sequence.body(email) == expected
+    assert sequence.body(email) == expected
+    assert COMPILED_TEMPLATE.cache.stats['hits'] == before + 1
+
+
+def test_render_without_digest_skips_cache():
+    size = len(COMPILED_TEMPLATE.cache)
+    render_template('<p>unique preview</p>', 'h.png', 'f.png')
+    assert len(COMPILED_TEMPLATE.cache) == size
+
+
+def test_compact_drops_digests():
+    sequence = EmailSequence([{'content': 'a', 'header_img': 'h', 'footer_img': 'f'}])
+    sequence.set_content(sequence[0], 'b')
+    assert sequence.compact() == 1
+    assert len(sequence.digests) == len(sequence.blobs) == 1
+    assert sequence.digest(sequence[0]['content']) is not None
+
+
+def test_version_follows_changes():
+    sequence = EmailSequence([{'id': 1, 'subject': 'Hi', 'content': 'a', 'header_img': 'h', 'footer_img': 'f'}])
+    version = sequence.version
+    # Writing back an unchanged value (as edit forms do on rerun) is not a change
+    sequence[0]['subject'] = 'Hi'
+    assert sequence.version == version
+
+    sequence[0]['subject'] = 'Hello'
+    assert sequence.version != version
+    version = sequence.version
+    copy = sequence[0].copy()
+    sequence.append(copy)
+    assert sequence.version != version
+    version = sequence.version
+    sequence[1]['id'] = 2
+    sequence.sort(key=lambda email: -email['id'])
+    del sequence[0]
+    assert sequence.version != version
+
+
+def test_versions_differ_between_sequences():
+    emails = [{'id': 1, 'content': 'a'}]
+    assert EmailSequence(emails).version != EmailSequence(emails).version
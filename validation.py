@@ -0,0 +1,226 @@
+"""Rule-based validation of newsletter HTML and sequence emails.
+
+Every check is a small rule returning structured findings (rule id,
+severity, message, location). Results are cached per content hash, and when
+many uncached items need checking at once (e.g. "Validate All" on a long
+sequence) they are split into chunks and run in a process pool.
+"""
+import atexit
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from content_cache import ContentCache, content_hash, shared
+from html_tools import extract_content, find_tag_mismatch
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Below this many uncached items the pool's overhead outweighs the gain
+PARALLEL_THRESHOLD = 64
+CHUNK_SIZE = 32
+
+
+def finding(rule: str, severity: str, message: str, **location) -> dict:
+    """A single validation result"""
+    return {'rule': rule, 'severity': severity, 'message': message, 'location': location}
+
+
+# --- HTML document rules -------------------------------------------------
+
+def check_document_structure(html_code: str) -> list:
+    """Required <html>/<body> tags"""
+    lower = html_code.lower()
+    required = [
+        ('<html', 'missing-html', "Missing <html> tag"),
+        ('<body', 'missing-body', "Missing <body> tag"),
+        ('</html>', 'missing-html-close', "Missing closing </html> tag"),
+        ('</body>', 'missing-body-close', "Missing closing </body> tag"),
+    ]
+    return [
+        finding(rule, WARNING, message, tag=tag)
+        for tag, rule, message in required
+        if tag not in lower
+    ]
+
+
+def check_tag_structure(html_code: str) -> list:
+    """First mismatched, unexpected or unclosed tag"""
+    mismatch = find_tag_mismatch(html_code)
+    if mismatch is None:
+        return []
+    return [finding(
+        mismatch['rule'], WARNING, mismatch['message'],
+        tag=mismatch['tag'], line=mismatch['line'], column=mismatch['column']
+    )]
+
+
+HTML_RULES = [check_document_structure, check_tag_structure]
+
+# Rule ids check_tag_structure reports (see html_tools.find_tag_mismatch)
+TAG_STRUCTURE_RULES = ('tag-mismatch', 'unexpected-close', 'unclosed-tag')
+
+
+def structure_error(findings: list) -> str:
+    """Message of the tag nesting error among a document's findings ('' if none)"""
+    for result in findings:
+        if result['rule'] in TAG_STRUCTURE_RULES:
+            return result['message']
+    return ''
+
+
+def run_html_rules(html_code) -> list:
+    """All HTML rules for one document"""
+    if not html_code or str(html_code).strip() == "":
+        return [finding('empty-html', ERROR, "HTML code is empty")]
+    html_code = str(html_code)
+    return [result for rule in HTML_RULES for result in rule(html_code)]
+
+
+# --- Sequence email rules ------------------------------------------------
+
+def check_subject(email: dict) -> list:
+    """Subject line present and of a sensible length"""
+    subject = email.get('subject')
+    if not subject:
+        return [finding('subject-missing', ERROR, "Missing subject line", field='subject')]
+    if len(subject) > 100:
+        return [finding('subject-too-long', WARNING, "Subject line is too long (>100 characters)",
+                        field='subject', length=len(subject))]
+    if len(subject) < 10:
+        return [finding('subject-too-short', WARNING, "Subject line is too short (<10 characters)",
+                        field='subject', length=len(subject))]
+    return []
+
+
+def check_body(email: dict) -> list:
+    """Email body present and of a sensible length (visible words)"""
+    body = email.get('email_body')
+    if not body:
+        return [finding('body-missing', ERROR, "Missing email body", field='email_body')]
+    word_count = extract_content(body)['word_count']
+    if word_count < 50:
+        return [finding('body-too-short', WARNING, "Email content is very short (<50 words)",
+                        field='email_body', words=word_count)]
+    if word_count > 1000:
+        return [finding('body-too-long', WARNING, "Email content is very long (>1000 words)",
+                        field='email_body', words=word_count)]
+    return []
+
+
+def check_delay(email: dict) -> list:
+    """Delay is not negative"""
+    if email.get('delay', 0) < 0:
+        return [finding('delay-negative', ERROR, "Delay cannot be negative", field='delay')]
+    return []
+
+
+EMAIL_RULES = [check_subject, check_body, check_delay]
+
+
+def run_email_rules(email: dict) -> list:
+    """All sequence email rules for one email"""
+    return [result for rule in EMAIL_RULES for result in rule(email)]
+
+
+# --- Engine --------------------------------------------------------------
+
+RUNNERS = {'html': run_html_rules, 'email': run_email_rules}
+
+
+def _cache_key(kind: str, item) -> str:
+    if kind == 'email':
+        item = json.dumps([item.get('subject'), item.get('email_body'), item.get('delay', 0)], default=str)
+    return content_hash(f"{kind}\x1f{item}")
+
+
+def _run_chunk(kind: str, items: list) -> list:
+    runner = RUNNERS[kind]
+    return [runner(item) for item in items]
+
+
+class ValidationEngine:
+    """Runs validation rules with a per-content cache and an optional process pool"""
+
+    def __init__(self, max_workers: int = None, parallel_threshold: int = PARALLEL_THRESHOLD,
+                 chunk_size: int = CHUNK_SIZE):
+        self.max_workers = max_workers
+        self.parallel_threshold = parallel_threshold
+        self.chunk_size = chunk_size
+        self.cache = ContentCache(max_entries=8192)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork the multi-threaded Streamlit server
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _discard_pool(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _run(self, kind: str, items: list) -> list:
+        if len(items) < self.parallel_threshold:
+            return _run_chunk(kind, items)
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        try:
+            pool = self._pool()
+            futures = [pool.submit(_run_chunk, kind, chunk) for chunk in chunks]
+            return [result for future in futures for result in future.result()]
+        except Exception:
+            # A broken or unavailable pool must never block validation
+            self._discard_pool()
+            return _run_chunk(kind, items)
+
+    def validate(self, kind: str, items: list) -> list:
+        """Findings for each item (same order), computing only uncached ones"""
+        keys = [_cache_key(kind, item) for item in items]
+        results = {}
+        pending = {}
+        for key, item in zip(keys, items):
+            if key in results or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                pending[key] = item
+            else:
+                results[key] = cached
+
+        if pending:
+            for key, found in zip(pending, self._run(kind, list(pending.values()))):
+                self.cache.put(key, found)
+                results[key] = found
+        return [results[key] for key in keys]
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self._discard_pool()
+
+
+VALIDATION_ENGINE = shared('validation', ValidationEngine)
+atexit.register(VALIDATION_ENGINE.shutdown)
+
+
+def validate_documents(html_codes: list) -> list:
+    """HTML rule findings for many documents"""
+    return VALIDATION_ENGINE.validate('html', list(html_codes))
+
+
+def validate_emails(emails: list) -> list:
+    """Sequence email rule findings for many emails"""
+    return VALIDATION_ENGINE.validate('email', list(emails))
+
+
+def validate_html(html_code):
+    """Basic HTML validation"""
+    issues = [result['message'] for result in validate_documents([html_code])[0]]
+    return issues if issues else ["✓ No major issues detected"]